@@ -0,0 +1,180 @@
+from collections import defaultdict
+from decimal import Decimal
+
+import pandas as pd
+from boto3.dynamodb.conditions import Attr, Key
+
+import config
+
+# Vorberechnete Summen pro Projekt. Jede Zeile der Summen-Tabelle ist ein "Bucket"
+# (Semester und Priorität, Status oder Datum, z. B. "FS2025#priority#1") mit Anzahl und
+# Summen je Betragsart. Die Zeilen werden beim Einfügen und Löschen per ADD nachgeführt,
+# statt bei jedem Aufruf neu zu scannen.
+AMOUNT_FIELDS = ["exact_amount", "estimated", "conservative", "worst_case"]
+SUMMARY_COLUMNS = ["project", "bucket", "count"] + AMOUNT_FIELDS
+KINDS = ["priority", "status", "date"]
+
+# Szenarien für die Leitung: exakte Beträge plus die jeweilige Schätzung
+SCENARIOS = ["estimated", "conservative", "worst_case"]
+
+NO_DATE = "none"  # Nicht an ein Datum gebunden
+UNKNOWN_DATE = "unknown"  # Datum noch nicht bekannt
+
+
+def _is_empty(value):
+    # Leere Werte, wie sie in DynamoDB-Items und im geladenen DataFrame vorkommen
+    if isinstance(value, str):
+        return value in ["", "None", "nan"]
+    return pd.isna(value)
+
+
+def _amount(value):
+    return Decimal(0) if _is_empty(value) else Decimal(str(value))
+
+
+def semester_of(item):
+    # Einträge ohne Semester stammen aus der Zeit vor der Einführung der Semester
+    semester = item.get("semester")
+    return config.LEGACY_SEMESTER if _is_empty(semester) else semester
+
+
+def buckets_for(item):
+    # Die drei Buckets, in die ein Eintrag zählt, jeweils im Semester des Eintrags
+    semester = semester_of(item)
+    priority = item.get("priority")
+    priority = "none" if _is_empty(priority) else str(int(priority))
+    date = item.get("expense_date")
+    date = NO_DATE if _is_empty(date) else date
+    return [f"{semester}#priority#{priority}", f"{semester}#status#{item.get('status') or 'not assigned'}",
+            f"{semester}#date#{date}"]
+
+
+def item_deltas(items, sign=1):
+    # Summiert die Änderungen mehrerer Einträge pro (Projekt, Bucket), damit ein Batch
+    # nur ein Update pro betroffenem Bucket braucht. sign=-1 beim Löschen.
+    deltas = defaultdict(lambda: dict.fromkeys(["count"] + AMOUNT_FIELDS, Decimal(0)))
+    for item in items:
+        for bucket in buckets_for(item):
+            delta = deltas[(item["project"], bucket)]
+            delta["count"] += sign
+            for field in AMOUNT_FIELDS:
+                delta[field] += sign * _amount(item.get(field))
+    return deltas
+
+
+def _add_expression(project, bucket, delta):
+    # Atomares ADD auf einen Bucket, legt fehlende Buckets automatisch an
+    return {
+        "Key": {"project": project, "bucket": bucket},
+        "UpdateExpression": "ADD #count :count, " + ", ".join(f"{field} :{field}" for field in AMOUNT_FIELDS),
+        "ExpressionAttributeNames": {"#count": "count"},
+        "ExpressionAttributeValues": {f":{field}": value for field, value in delta.items()},
+    }
+
+
+def apply_items(summary_table, items, sign=1):
+    # Inkrementelle Nachführung: ein ADD pro betroffenem Bucket
+    for (project, bucket), delta in item_deltas(items, sign).items():
+        summary_table.update_item(**_add_expression(project, bucket, delta))
+
+
+def transaction_updates(summary_table_name, items, sign=1):
+    # Dieselben ADDs als Aktionen für TransactWriteItems, damit sie zusammen mit dem Eintrag
+    # geschrieben werden (ein Eintrag betrifft drei Buckets)
+    return [{"Update": {"TableName": summary_table_name, **_add_expression(project, bucket, delta)}}
+            for (project, bucket), delta in item_deltas(items, sign).items()]
+
+
+def summarize(expenses):
+    # Dieselben Buckets aus einem DataFrame berechnet, z. B. zum Neuaufbau oder Abgleich
+    rows = [{"project": project, "bucket": bucket, **delta}
+            for (project, bucket), delta in item_deltas(expenses.to_dict("records")).items()]
+    return _typed(pd.DataFrame(rows, columns=SUMMARY_COLUMNS))
+
+
+def rebuild(summary_table, expenses):
+    # Baut die Summen-Tabelle komplett aus den Einträgen neu auf (z. B. nach einem Fehler
+    # zwischen dem Schreiben eines Eintrags und dem Nachführen der Summen)
+    deltas = item_deltas(expenses.to_dict("records"))
+    stale = {(row["project"], row["bucket"]) for row in read_rows(summary_table)} - set(deltas)
+    with summary_table.batch_writer() as batch:
+        for project, bucket in stale:
+            batch.delete_item(Key={"project": project, "bucket": bucket})
+        for (project, bucket), delta in deltas.items():
+            batch.put_item(Item={"project": project, "bucket": bucket, **delta})
+
+
+def read_rows(summary_table, project=None, semester=None):
+    # Ein Query pro Projekt (mit Semester nur dessen Buckets), ohne Projekt werden alle
+    # Summen gelesen (wenige hundert Zeilen pro Semester)
+    if project:
+        condition = Key("project").eq(project)
+        kwargs = {"KeyConditionExpression": condition & Key("bucket").begins_with(f"{semester}#") if semester else condition}
+    else:
+        kwargs = {"FilterExpression": Attr("bucket").begins_with(f"{semester}#")} if semester else {}
+    read = summary_table.query if project else summary_table.scan
+    rows = []
+    while True:
+        response = read(**kwargs)
+        rows.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    return rows
+
+
+def load(summary_table, project=None, semester=None):
+    return from_rows(read_rows(summary_table, project, semester))
+
+
+def from_rows(rows):
+    # Summen-Zeilen (dicts wie in der Summen-Tabelle) als typisiertes DataFrame
+    return _typed(pd.DataFrame(rows, columns=SUMMARY_COLUMNS))
+
+
+def _typed(rows):
+    rows = rows.astype({"count": "int64", **dict.fromkeys(AMOUNT_FIELDS, "float64")})
+    rows = rows[rows["count"] > 0]  # Buckets, deren Einträge alle gelöscht wurden
+    parts = rows["bucket"].str.split("#", n=2)
+    # Buckets ohne Semester ("priority#1") stammen von vor der Einführung der Semester,
+    # bis rebuild_summaries() sie ersetzt hat
+    legacy = parts.str[0].isin(KINDS)
+    return rows.assign(semester=parts.str[0].where(~legacy, config.LEGACY_SEMESTER),
+                       kind=parts.str[1].where(~legacy, parts.str[0]),
+                       value=parts.str[2].where(~legacy, parts.str[1]))
+
+
+def with_scenarios(totals):
+    for scenario in SCENARIOS:
+        totals[f"exact_plus_{scenario}"] = totals["exact_amount"] + totals[scenario]
+    return totals
+
+
+def scenario_totals(rows, by="project"):
+    # Summen pro Projekt (by="project") oder pro Priorität (by="priority") je Szenario
+    priority_rows = rows[rows["kind"] == "priority"]
+    keys = ["project"] if by == "project" else ["project", "value"]
+    totals = priority_rows.groupby(keys, as_index=False)[["count"] + AMOUNT_FIELDS].sum()
+    return with_scenarios(totals.rename(columns={"value": "priority"}))
+
+
+def status_breakdown(rows):
+    status_rows = rows[rows["kind"] == "status"]
+    totals = status_rows.groupby(["project", "value"], as_index=False)[["count"] + AMOUNT_FIELDS].sum()
+    return with_scenarios(totals.rename(columns={"value": "status"}))
+
+
+def cumulative_by_date(rows):
+    # Kumulierte Ausgaben nach Datum über alle gegebenen Zeilen; "unknown" und ohne Datum
+    # werden separat ausgewiesen, weil sie sich keinem Zeitpunkt zuordnen lassen
+    date_rows = rows[rows["kind"] == "date"]
+    totals = with_scenarios(date_rows.groupby("value", as_index=False)[["count"] + AMOUNT_FIELDS].sum())
+    scenario_columns = ["exact_amount"] + [f"exact_plus_{scenario}" for scenario in SCENARIOS]
+
+    dated = totals[~totals["value"].isin([UNKNOWN_DATE, NO_DATE])].sort_values("value")
+    cumulative = dated[["value"]].rename(columns={"value": "expense_date"})
+    for column in scenario_columns:
+        cumulative[f"cumulative_{column}"] = dated[column].cumsum()
+
+    undated = totals[totals["value"].isin([UNKNOWN_DATE, NO_DATE])].set_index("value")[["count"] + scenario_columns]
+    return cumulative.reset_index(drop=True), undated
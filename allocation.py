@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+import aggregation
+
+# Vorschlag, welche Ausgaben finanziert werden. Zuerst aus dem garantierten Budget des Projekts
+# (Gewinn des letzten Semesters), danach aus dem Budget der Leitung, jeweils in der Reihenfolge
+# der Priorität. Ein Projekt bekommt eine Ausgabe nie vor einer mit höherer Priorität.
+PROPOSED_FUNDED = "proposed: funded"
+PROPOSED_NOT_FUNDED = "proposed: not funded"
+# Nur diese Status dürfen überschrieben werden; alles andere hat die Leitung endgültig gesetzt
+OPEN_STATUSES = ["not assigned", PROPOSED_FUNDED, PROPOSED_NOT_FUNDED]
+
+FROM_PROJECT_BUDGET = "project budget"
+FROM_BOARD_BUDGET = "board budget"
+FROM_BOTH_BUDGETS = "project and board budget"  # Rest des Projektbudgets, den Fehlbetrag zahlt die Leitung
+
+SCENARIOS = aggregation.SCENARIOS
+
+RESULT_COLUMNS = ["id", "project", "title", "priority", "cost", "funded_from", "board_share", "proposed_status",
+                  "status"]
+
+
+def expense_cost(expenses, scenario="estimated"):
+    # Exakter Betrag, sonst die Schätzung des Szenarios; ohne Betrag 0
+    exact = expenses["exact_amount"].to_numpy(dtype="float64")
+    estimate = expenses[scenario].to_numpy(dtype="float64")
+    return np.nan_to_num(np.where(exact > 0, exact, estimate))
+
+
+def _priority(expenses):
+    # Ohne Priorität zuletzt
+    return expenses["priority"].astype("float64").fillna(np.inf).to_numpy()
+
+
+def _cumsum_by_group(values, groups):
+    # Kumulierte Summe, die bei jeder neuen Gruppe von vorne beginnt (groups sortiert)
+    if not len(values):
+        return values
+    total = np.cumsum(values)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    lengths = np.diff(np.r_[starts, len(values)])
+    return total - np.repeat(total[starts] - values[starts], lengths)
+
+
+def allocate(expenses, project_budgets, board_budget, scenario="estimated"):
+    # Greedy über alle offenen Ausgaben, vollständig vektorisiert (Sortieren und kumulierte Summen
+    # mit numpy). Gibt eine Zeile pro Ausgabe mit vorgeschlagenem Status zurück; Ausgaben mit
+    # endgültigem Status werden nicht neu vorgeschlagen und verbrauchen kein Budget.
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    open_expenses = expenses[expenses["status"].astype(str).isin(OPEN_STATUSES).to_numpy()]
+    codes, projects = pd.factorize(open_expenses["project"])
+    priority = _priority(open_expenses)
+    cost = expense_cost(open_expenses, scenario)
+
+    # 1. Garantiertes Budget: pro Projekt nach Priorität (bei Gleichstand die günstigere zuerst),
+    #    finanziert ist der Anfang der Liste, dessen kumulierte Summe ins Budget passt
+    order = np.lexsort((cost, priority, codes))
+    codes, priority, cost = codes[order], priority[order], cost[order]
+    caps = np.array([project_budgets.get(project, 0) for project in projects], dtype="float64")
+    from_project = _cumsum_by_group(cost, codes) <= caps[codes]
+
+    # 2. Budget der Leitung: was übrig bleibt, über alle Projekte nach Priorität. Die erste nicht
+    #    finanzierte Ausgabe eines Projekts braucht den Rest seines Budgets auf, die Leitung zahlt
+    #    nur den Fehlbetrag. Finanziert ist wieder nur der Anfang der Liste: passt eine Ausgabe nicht
+    #    mehr, wird keine mit tieferer Priorität vorgezogen (innerhalb eines Projekts bleibt die
+    #    Reihenfolge aus Schritt 1).
+    leftover = caps - np.bincount(codes, weights=np.where(from_project, cost, 0), minlength=len(caps))
+    rest = np.flatnonzero(~from_project)
+    charge = cost.copy()
+    first_rest = rest[np.r_[True, codes[rest][1:] != codes[rest][:-1]]] if len(rest) else rest
+    charge[first_rest] -= leftover[codes[first_rest]]
+    rest = rest[np.lexsort((charge[rest], priority[rest]))]
+    from_board = np.zeros(len(cost), dtype=bool)
+    from_board[rest] = np.cumsum(charge[rest]) <= board_budget
+    board_share = np.where(from_board, charge, 0.0)
+
+    funded_from = np.full(len(cost), None, dtype=object)
+    funded_from[from_project] = FROM_PROJECT_BUDGET
+    funded_from[from_board] = FROM_BOARD_BUDGET
+    funded_from[from_board & (board_share < cost)] = FROM_BOTH_BUDGETS
+    rows = open_expenses.iloc[order]
+    return pd.DataFrame({
+        "id": rows["id"].astype(str).to_numpy(),
+        "project": projects[codes],
+        "title": rows["title"].to_numpy(),
+        "priority": pd.array(np.where(np.isinf(priority), np.nan, priority), dtype="Int64"),
+        "cost": cost,
+        "funded_from": funded_from,
+        "board_share": board_share,
+        "proposed_status": np.where(from_project | from_board, PROPOSED_FUNDED, PROPOSED_NOT_FUNDED),
+        "status": rows["status"].astype(str).to_numpy(),
+    }, columns=RESULT_COLUMNS)
+
+
+def allocation_summary(result, project_budgets, board_budget):
+    # Pro Projekt: Budget, daraus finanziert, von der Leitung finanziert, nicht finanziert
+    funded = result.assign(
+        from_project=(result["cost"] - result["board_share"]).where(result["funded_from"].notna(), 0),
+        from_board=result["board_share"],
+        not_funded=result["cost"].where(result["funded_from"].isna(), 0),
+    )
+    summary = funded.groupby("project", as_index=False)[["from_project", "from_board", "not_funded"]].sum()
+    summary.insert(1, "project_budget", summary["project"].map(project_budgets).fillna(0))
+    board_left = board_budget - summary["from_board"].sum()
+    return summary, board_left
+
+
+def status_changes(result):
+    # Nur Ausgaben, deren vorgeschlagener Status sich vom gespeicherten unterscheidet: ID -> Status
+    changed = result[result["proposed_status"] != result["status"]]
+    return dict(zip(changed["id"], changed["proposed_status"]))
@@ -0,0 +1,120 @@
+# Archivierung abgeschlossener Semester: die Einträge werden als Parquet-Datei abgelegt, die
+# Summen pro Projekt in die Archiv-Tabelle geschrieben (nur lesend verwendet) und danach aus
+# der Tabelle der Einträge und der laufenden Summen-Tabelle entfernt. So bleibt die Tabelle,
+# die die App bei jedem Rerun liest, von Jahr zu Jahr etwa gleich gross.
+#
+# Ausführen mit: python archive.py FS2025 --dir /pfad/zum/archiv [--create-table]
+import argparse
+import os
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+import pyarrow.parquet as pq
+from boto3.dynamodb.conditions import Key
+
+import aggregation
+import config
+import db
+import snapshot
+
+# Archiv-Tabelle: Partition Key "semester", Sort Key "bucket_key" ("<Projekt>#<Bucket>"), beide String
+archive_table_name = os.getenv("OIKOS_ARCHIVE_TABLE", "oikos_budgeting_archive")
+archive_table = db.dynamodb.Table(archive_table_name)
+ARCHIVE_DIR = os.getenv("OIKOS_ARCHIVE_DIR")
+
+
+def create_archive_table():
+    # Einmalig ausführen, legt die Archiv-Tabelle an
+    db.dynamodb.create_table(
+        TableName=archive_table_name,
+        KeySchema=[{"AttributeName": "semester", "KeyType": "HASH"},
+                   {"AttributeName": "bucket_key", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "semester", "AttributeType": "S"},
+                              {"AttributeName": "bucket_key", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    archive_table.wait_until_exists()
+
+
+def is_archived(semester):
+    return bool(archive_table.query(KeyConditionExpression=Key("semester").eq(semester), Limit=1).get("Items"))
+
+
+def archive_semester(semester, directory=None):
+    directory = directory or ARCHIVE_DIR
+    if semester == config.ACTIVE_SEMESTER:
+        raise ValueError(f"{semester} is the active semester and cannot be archived")
+    if not directory:
+        raise ValueError("No archive directory, set OIKOS_ARCHIVE_DIR or pass --dir")
+    if is_archived(semester):
+        raise ValueError(f"{semester} is already archived")
+    start = time.perf_counter()
+
+    # 1. Einträge Seite für Seite in die Parquet-Datei schreiben und dabei summieren
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{semester}.parquet")
+    totals = defaultdict(lambda: dict.fromkeys(["count"] + aggregation.AMOUNT_FIELDS, Decimal(0)))
+    expense_ids = []
+    with pq.ParquetWriter(path, snapshot.SCHEMA) as writer:
+        for page in db.scan_pages(FilterExpression=db.semester_filter(semester)):
+            if not page:
+                continue
+            writer.write_batch(snapshot.page_to_batch(page, 0))
+            for key, delta in aggregation.item_deltas([dict(item, semester=semester) for item in page]).items():
+                for field, value in delta.items():
+                    totals[key][field] += value
+            expense_ids.extend(item["id"] for item in page)
+
+    # 2. Summen ins Archiv; ab hier gilt das Semester als archiviert
+    archived_at = db.now_iso()
+    with archive_table.batch_writer() as batch:
+        for (project, bucket), delta in totals.items():
+            batch.put_item(Item={"semester": semester, "bucket_key": f"{project}#{bucket}", "project": project,
+                                 "bucket": bucket, "archived_at": archived_at, **delta})
+
+    # 3. Einträge und laufende Summen des Semesters entfernen
+    with db.table.batch_writer() as batch:
+        for expense_id in expense_ids:
+            batch.delete_item(Key={"id": expense_id})
+    summary_rows = aggregation.read_rows(db.summary_table, semester=semester)
+    with db.summary_table.batch_writer() as batch:
+        for row in summary_rows:
+            batch.delete_item(Key={"project": row["project"], "bucket": row["bucket"]})
+    db.expense_cache.invalidate()
+
+    return {"semester": semester, "expenses": len(expense_ids), "summary_rows": len(totals),
+            "file": path, "seconds": time.perf_counter() - start}
+
+
+def load_archive(semester, project=None):
+    # Archivierte Summen eines Semesters, Spalten wie db.load_summary
+    condition = Key("semester").eq(semester)
+    if project:
+        condition = condition & Key("bucket_key").begins_with(f"{project}#")
+    kwargs = {"KeyConditionExpression": condition}
+    rows = []
+    while True:
+        response = archive_table.query(**kwargs)
+        rows.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    return aggregation.from_rows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive a finished semester")
+    parser.add_argument("semester", help="semester to archive, e.g. FS2025")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="directory for the Parquet file (default: OIKOS_ARCHIVE_DIR)")
+    parser.add_argument("--create-table", action="store_true", help="create the archive table first")
+    args = parser.parse_args()
+    if args.create_table:
+        create_archive_table()
+    result = archive_semester(args.semester, args.dir)
+    print(f"Archived {result['expenses']} expenses of {result['semester']} ({result['summary_rows']} summary rows) "
+          f"to {result['file']} in {result['seconds']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Micro-Benchmark: allocation.allocate über alle Projekte und alle drei Szenarien, wie die Leitung
+# es auf der Seite ?allocation=1 bei jeder Eingabe neu rechnet. Keine Datenbank nötig.
+#
+# Ausführen mit: python benchmarks/bench_allocation.py [Wiederholungen]
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from common import PROJECT_NAMES, synthetic_rows
+
+import allocation
+import db
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def synthetic_expenses(count):
+    items = [db.build_expense_item(str(number), project, **row)
+             for number, (project, row) in enumerate(((project, row) for project, rows in synthetic_rows(count).items()
+                                                      for row in rows), start=1)]
+    return db.pages_to_expenses([pd.DataFrame(items, dtype=object)])
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for size in SIZES:
+        expenses = synthetic_expenses(size)
+        total = allocation.expense_cost(expenses, "estimated").sum()
+        # Garantiert ist etwa ein Drittel, die Leitung gibt ein weiteres Drittel dazu
+        project_budgets = dict.fromkeys(PROJECT_NAMES, total / 3 / len(PROJECT_NAMES))
+        for scenario in allocation.SCENARIOS:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = allocation.allocate(expenses, project_budgets, total / 3, scenario)
+                timings.append(time.perf_counter() - start)
+            funded = (result["proposed_status"] == allocation.PROPOSED_FUNDED).sum()
+            print(f"{size:>8} expenses  {scenario:<13} median {statistics.median(timings) * 1000:7.1f} ms  "
+                  f"({funded} funded)")
+
+
+if __name__ == "__main__":
+    main()
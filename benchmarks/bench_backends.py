@@ -0,0 +1,68 @@
+# Vergleicht DynamoDB und PostgreSQL bei Lade- und Summen-Latenz.
+#
+# DynamoDB: gegen DYNAMODB_ENDPOINT_URL (z. B. DynamoDB Local) oder, falls nicht gesetzt,
+# gegen moto im selben Prozess (pip install moto). PostgreSQL: OIKOS_POSTGRES_DSN muss auf
+# eine leere Test-Datenbank zeigen, sonst wird der Vergleich übersprungen.
+#
+# Ausführen mit: python benchmarks/bench_backends.py [Anzahl Einträge] [Wiederholungen]
+import os
+import statistics
+import sys
+import time
+
+from common import PROJECT_NAMES, create_tables, synthetic_rows
+
+import config
+import db
+import storage
+
+
+def seed(store, rows):
+    for project, project_rows in rows.items():
+        store.import_expenses(project, project_rows)
+
+
+def measure(call, repeats, before=None):
+    timings = []
+    for _ in range(repeats):
+        if before:
+            before()
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+def run(store, repeats, before=None):
+    project, semester = PROJECT_NAMES[0], config.ACTIVE_SEMESTER
+    return {
+        "load project": measure(lambda: store.load_project_expenses(project, semester=semester), repeats, before),
+        "load all": measure(lambda: store.load_expenses(semester=semester), repeats, before),
+        "totals (all projects)": measure(lambda: store.scenario_totals(semester=semester), repeats, before),
+    }
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rows = synthetic_rows(count)
+
+    create_tables()
+    stores = {"dynamodb": storage.DynamoStore()}
+    if os.getenv("OIKOS_POSTGRES_DSN"):
+        stores["postgres"] = storage.PostgresStore()
+    else:
+        print("OIKOS_POSTGRES_DSN not set, skipping PostgreSQL")
+
+    results = {}
+    for name, store in stores.items():
+        seed(store, rows)
+        # Der Cache von DynamoStore wird vor jeder Messung geleert, gemessen wird der Speicher selbst
+        results[name] = run(store, repeats, before=db.expense_cache.invalidate)
+
+    print(f"{count} expenses, {repeats} runs, median / p95 in ms")
+    print(f"{'operation':<24}" + "".join(f"{name:>22}" for name in results))
+    for operation in next(iter(results.values())):
+        print(f"{operation:<24}" + "".join(
+            f"{results[name][operation][0] * 1000:>11.1f} / {results[name][operation][1] * 1000:>7.1f}" for name in results))
@@ -0,0 +1,123 @@
+# Micro-Benchmark: Typumwandlung in db.load_expenses, frühere Schleife pro Item
+# gegen die spaltenweise Umwandlung. Ausführen mit: python benchmarks/bench_coercion.py
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")  # db erstellt beim Import eine Resource
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd  # noqa: E402
+
+import db  # noqa: E402
+
+SIZES = [10_000, 100_000, 1_000_000]
+PAGE_SIZE = 2_000  # etwa so viele Einträge passen in eine 1-MB-Seite von DynamoDB
+
+
+def legacy_convert(items):
+    # Konvertiere Werte in die richtigen Datentypen
+    for item in items:
+        if 'exact_amount' in item:
+            item['exact_amount'] = float(item['exact_amount']) if item['exact_amount'] not in [None, ""] else None
+        if 'estimated' in item:
+            item['estimated'] = float(item['estimated']) if item['estimated'] not in [None, ""] else None
+        if 'conservative' in item:
+            item['conservative'] = float(item['conservative']) if item['conservative'] not in [None, ""] else None
+        if 'worst_case' in item:
+            item['worst_case'] = float(item['worst_case']) if item['worst_case'] not in [None, ""] else None
+        if 'priority' in item:
+            item['priority'] = int(item['priority']) if item['priority'] not in [None, ""] else None
+        if 'id' in item:
+            item['id'] = str(item['id'])
+        if 'project' in item:
+            item['project'] = str(item['project'])
+        if 'title' in item:
+            item['title'] = str(item['title'])
+        if 'description' in item:
+            item['description'] = str(item['description'])
+        if 'expense_date' in item:
+            item['expense_date'] = str(item['expense_date'])
+        if 'status' in item:
+            item['status'] = str(item['status'])
+    return pd.DataFrame(items)
+
+
+def legacy_frames_to_expenses(frames):
+    # Fügt die Teil-DataFrames der einzelnen Seiten zu einem typisierten DataFrame zusammen
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=db.EXPENSE_COLUMNS)
+
+    df = pd.concat(frames, ignore_index=True)
+
+    # Fehlende Spalten hinzufügen
+    for col in db.EXPENSE_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    # Setze Datentypen explizit
+    return df.astype({
+        "id": str,
+        "project": str,
+        "title": str,
+        "description": str,
+        "expense_date": str,
+        "exact_amount": "float64",
+        "estimated": "float64",
+        "conservative": "float64",
+        "worst_case": "float64",
+        "priority": "Int64",  # Int64 erlaubt auch NaN
+        "status": str
+    }, errors="ignore")
+
+
+def synthetic_items(count, seed=0):
+    rng = random.Random(seed)
+    projects = ["oikos Conference", "Sustainability Week", "Action Days", "UN-DRESS", "oikos Solar", "Oismak"]
+    items = []
+    for i in range(1, count + 1):
+        exact = rng.random() < 0.5
+        item = {
+            "id": str(i),
+            "project": rng.choice(projects),
+            "title": f"Expense {i}",
+            "description": "Catering for the event",
+            "expense_date": rng.choice(["2025-03-01", "2025-04-15", "unknown", None]),
+            "exact_amount": str(round(rng.uniform(10, 5000), 2)) if exact else None,
+            "estimated": None if exact else str(round(rng.uniform(10, 5000), 2)),
+            "conservative": None if exact else str(round(rng.uniform(10, 6000), 2)),
+            "worst_case": None if exact else str(round(rng.uniform(10, 8000), 2)),
+            "priority": rng.randint(1, 5),
+            "status": rng.choice(["not assigned", "approved", "rejected"]),
+        }
+        if rng.random() < 0.05:
+            del item["priority"]  # Einträge ohne Priorität kommen ebenfalls vor
+        items.append(item)
+    return [items[start:start + PAGE_SIZE] for start in range(0, count, PAGE_SIZE)]
+
+
+def run(count):
+    pages = synthetic_items(count)
+
+    start = time.perf_counter()
+    legacy = legacy_frames_to_expenses([legacy_convert([dict(item) for item in page]) for page in pages])
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = db.pages_to_expenses([db._page_frame(page) for page in pages])
+    vectorized_seconds = time.perf_counter() - start
+
+    # Gleiche Werte wie bisher, nur project und status sind jetzt Kategorien
+    compared = vectorized.astype({column: legacy[column].dtype for column in db.CATEGORY_COLUMNS})
+    pd.testing.assert_frame_equal(compared[legacy.columns], legacy)
+    return legacy_seconds, vectorized_seconds
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    print(f"{'rows':>10} {'per item (s)':>14} {'columns (s)':>14} {'speedup':>9}")
+    for size in sizes:
+        legacy_seconds, vectorized_seconds = run(size)
+        print(f"{size:>10} {legacy_seconds:>14.3f} {vectorized_seconds:>14.3f} {legacy_seconds / vectorized_seconds:>8.1f}x")
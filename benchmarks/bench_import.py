@@ -0,0 +1,40 @@
+# Kaltstart der App: Importzeit bis zur Login-Seite, einmal nur mit Streamlit und config (wie jetzt)
+# und einmal mit allen Modulen samt DynamoDB-Client (wie früher beim Start). Jede Messung läuft in
+# einem frischen Python-Prozess, damit nichts aus sys.modules wiederverwendet wird.
+#
+# Ausführen mit: python benchmarks/bench_import.py [Wiederholungen]
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+LOGIN_IMPORTS = "import streamlit, config, instrumentation"
+EAGER_IMPORTS = LOGIN_IMPORTS + "; import pandas, boto3, clients, db, importer, render, storage"
+
+
+def cold_import_seconds(imports):
+    code = f"import time; start = time.perf_counter(); {imports}; print(time.perf_counter() - start)"
+    env = {**os.environ, "AWS_REGION": os.getenv("AWS_REGION", "eu-central-1")}
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    cold_import_seconds(EAGER_IMPORTS)  # Aufwärmen: .pyc-Dateien schreiben, Dateisystem-Cache füllen
+
+    results = {}
+    for name, imports in [("login page (lazy)", LOGIN_IMPORTS), ("everything at start (eager)", EAGER_IMPORTS)]:
+        timings = [cold_import_seconds(imports) for _ in range(repeats)]
+        results[name] = statistics.median(timings)
+        print(f"{name:<30} median {results[name] * 1000:8.1f} ms  (min {min(timings) * 1000:.1f} ms)")
+
+    lazy, eager = results.values()
+    print(f"Login page is ready {eager / lazy:.1f}x faster ({(eager - lazy) * 1000:.0f} ms less per cold start)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Warteschlange für neue Ausgaben (outbox.py) unter simulierter Drosselung: ein Teil der Aufrufe
+# an den Speicher scheitert mit ProvisionedThroughputExceededException, ein weiterer Teil scheitert
+# erst nach dem Schreiben (Antwort verloren). Gemessen wird die Wartezeit beim Absenden gegenüber
+# dem direkten Speichern; am Ende muss jede Eingabe genau einmal in der Tabelle stehen.
+#
+# Läuft wie die anderen Benchmarks gegen DYNAMODB_ENDPOINT_URL oder moto.
+# Ausführen mit: python benchmarks/bench_outbox.py [Anzahl Eingaben] [Anteil gedrosselt]
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["OIKOS_OUTBOX_PATH"] = os.path.join(tempfile.mkdtemp(), "outbox.sqlite3")
+os.environ.setdefault("OIKOS_OUTBOX_INTERVAL", "0.05")
+os.environ.setdefault("OIKOS_OUTBOX_MAX_BACKOFF", "1")
+
+from botocore.exceptions import ClientError
+
+from common import create_tables, synthetic_rows
+
+import config
+import db
+import outbox
+import storage
+
+
+class ThrottledStore(storage.DynamoStore):
+    # Lokaler Stellvertreter: wie DynamoStore, aber mit zufälliger Drosselung vor und nach dem Schreiben
+
+    def __init__(self, throttle_rate, seed=0):
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.throttled = 0
+        self.lost_responses = 0
+
+    def _throttle(self, operation):
+        self.throttled += 1
+        raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "simulated"}}, operation)
+
+    def allocate_ids(self, count):
+        if self.rng.random() < self.throttle_rate:
+            self._throttle("UpdateItem")
+        return super().allocate_ids(count)
+
+    def write_submissions(self, submissions):
+        if self.rng.random() < self.throttle_rate:
+            self._throttle("PutItem")
+        outcomes = super().write_submissions(submissions)
+        if self.rng.random() < self.throttle_rate:
+            # Geschrieben, aber die Antwort geht verloren: der nächste Versuch muss das erkennen
+            self.lost_responses += 1
+            self._throttle("PutItem")
+        return outcomes
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return statistics.median(timings) * 1000, timings[int(len(timings) * 0.99) - 1] * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    throttle_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    create_tables()
+    rows = [(project, dict(row, semester=config.ACTIVE_SEMESTER))
+            for project, project_rows in synthetic_rows(count).items() for row in project_rows]
+
+    # Direkt speichern, wie bisher im Formular (ohne Drosselung)
+    store = storage.DynamoStore()
+    direct = []
+    for project, row in rows[:50]:
+        start = time.perf_counter()
+        store.insert_expense(project, **{field: value for field, value in row.items() if field != "semester"})
+        direct.append(time.perf_counter() - start)
+
+    # Über die Warteschlange, mit Drosselung
+    throttled_store = ThrottledStore(throttle_rate)
+    before = len(db.load_expenses()[0])
+    outbox.start_worker(throttled_store)
+    queued, keys = [], []
+    for project, row in rows:
+        start = time.perf_counter()
+        keys.append(outbox.submit(project, row))
+        queued.append(time.perf_counter() - start)
+    for key, (project, row) in zip(keys[:20], rows):
+        outbox.submit(project, row, key=key)  # doppelt abgeschickt, muss ignoriert werden
+
+    start = time.perf_counter()
+    while outbox.stats()["pending"]:
+        time.sleep(0.05)
+    drained = time.perf_counter() - start
+
+    expenses, _ = db.load_expenses()
+    added = expenses[expenses["submission_key"].isin(keys)]
+    print(f"direct insert        median {percentiles(direct)[0]:7.2f} ms  p99 {percentiles(direct)[1]:7.2f} ms")
+    print(f"queued submit        median {percentiles(queued)[0]:7.2f} ms  p99 {percentiles(queued)[1]:7.2f} ms")
+    print(f"drained {count} submissions in {drained:.1f} s with {throttled_store.throttled} throttled calls "
+          f"({throttled_store.lost_responses} lost responses)")
+    print(f"saved {len(added)} of {count}, {added['submission_key'].duplicated().sum()} duplicates, "
+          f"table grew by {len(expenses) - before}")
+    assert len(added) == count and not added["submission_key"].duplicated().any() and len(expenses) - before == count
+    print("OK: every submission saved exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# Last-Test der Datenpfade: insert_expense, Laden (Projekt und ganze Tabelle), delete_expense
+# und das Rendern der Übersicht, bei wachsender Tabellengrösse und mehreren gleichzeitigen Sitzungen.
+#
+# Läuft gegen DYNAMODB_ENDPOINT_URL (empfohlen für grosse Tabellen, z. B. DynamoDB Local) oder,
+# falls nicht gesetzt, gegen moto im selben Prozess (pip install moto). Die Ergebnisse werden als
+# JSON geschrieben, damit sich Läufe verschiedener Commits vergleichen lassen.
+#
+# Ausführen mit: python benchmarks/bench_suite.py --sizes 1000 10000 --sessions 8 --output results.json
+import argparse
+import datetime
+import json
+import os
+import random
+import resource
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Verbrauchte Kapazität und Aufrufe misst instrumentation.py; die Hooks werden nur registriert,
+# wenn die Messung beim Erstellen des DynamoDB-Clients eingeschaltet ist
+os.environ["OIKOS_INSTRUMENTATION"] = "1"
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+from common import PROJECT_NAMES, create_tables, synthetic_rows
+
+import config
+import db
+import instrumentation
+import render
+import storage
+
+
+class CapacityRecorder:
+    # Sammelt die DynamoDB-Aufrufe der Traces von instrumentation.py pro gemessener Operation.
+    # Aufrufe aus Hilfs-Threads (paralleler Scan) landen über in_current_context im selben Trace.
+    def __init__(self):
+        self.units = defaultdict(lambda: {"read": 0.0, "write": 0.0, "calls": 0})
+        self.lock = threading.Lock()
+
+    def record(self, operation, trace):
+        with self.lock:
+            for name, values in trace.summary()["dynamodb"].items():
+                kind = "read" if name in instrumentation.READ_OPERATIONS else "write"
+                self.units[operation]["calls"] += values["calls"]
+                self.units[operation][kind] += values["capacity_units"]
+
+    def timed(self, operation, timings, call):
+        with instrumentation.rerun(operation) as trace:
+            start = time.perf_counter()
+            try:
+                return call()
+            finally:
+                timings[operation].append(time.perf_counter() - start)
+                self.record(operation, trace)
+
+
+def reset_tables():
+    # Frische Tabellen für jede Grösse
+    for existing in [db.table, db.counter_table, db.summary_table]:
+        try:
+            existing.delete()
+            existing.wait_until_not_exists()
+        except ClientError:
+            pass
+    create_tables()
+    db.expense_cache.invalidate()
+
+
+def percentiles(timings):
+    timings = np.array(timings) * 1000
+    return {"count": len(timings), "p50_ms": float(np.percentile(timings, 50)),
+            "p95_ms": float(np.percentile(timings, 95)), "p99_ms": float(np.percentile(timings, 99))}
+
+
+def session(store, recorder, timings, iterations, seed):
+    # Eine simulierte Sitzung: Übersicht laden und rendern, Ausgabe erfassen und wieder löschen
+    rng = random.Random(seed)
+    project, semester = rng.choice(PROJECT_NAMES), config.ACTIVE_SEMESTER
+
+    def timed(operation, call):
+        return recorder.timed(operation, timings, call)
+
+    for _ in range(iterations):
+        # Nach jedem Schreiben ist der Cache des Projekts leer: der erste Aufruf liest aus DynamoDB,
+        # der zweite (wie bei jedem weiteren Rerun ohne Änderung) aus dem Cache
+        df, _ = timed("load_data_from_db", lambda: store.load_project_expenses(project, semester=semester))
+        timed("load_data_from_db (cache hit)", lambda: store.load_project_expenses(project, semester=semester))
+        timed("render overview", lambda: render.cards_html(df, render.project_color(project)))
+        expense_id = timed("insert_expense", lambda: store.insert_expense(
+            project, "Load test", "Synthetic expense", "2025-03-20", None, 100.0, 120.0, 150.0, rng.randint(1, 5)))
+        timed("delete_expense_by_id", lambda: store.delete_expense(expense_id, project))
+
+
+def peak_memory(call):
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_size(size, sessions, iterations, recorder):
+    reset_tables()
+    store = storage.DynamoStore()
+    start = time.perf_counter()
+    for project, rows in synthetic_rows(size).items():
+        store.import_expenses(project, rows)
+    seed_seconds = time.perf_counter() - start
+
+    timings = defaultdict(list)
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        futures = [executor.submit(session, store, recorder, timings, iterations, seed) for seed in range(sessions)]
+        for future in futures:
+            future.result()
+
+    # Die ganze Tabelle wird nur einzeln geladen, so wie es der Export oder die Leitung tut
+    for _ in range(3):
+        recorder.timed("load_expenses (full table)", timings, db.load_expenses)
+
+    project, semester = PROJECT_NAMES[0], config.ACTIVE_SEMESTER
+    df, _ = db.load_project_expenses(project, semester=semester)
+    memory = {
+        "load_data_from_db": peak_memory(lambda: db.load_project_expenses(project, semester=semester)),
+        "load_expenses (full table)": peak_memory(db.load_expenses),
+        "render overview": peak_memory(lambda: render.cards_html(df, render.project_color(project))),
+    }
+
+    operations = {}
+    for operation, values in timings.items():
+        capacity = recorder.units.pop(operation, {"read": 0.0, "write": 0.0, "calls": 0})
+        operations[operation] = {
+            **percentiles(values),
+            "read_capacity_units": capacity["read"],
+            "write_capacity_units": capacity["write"],
+            "dynamodb_calls": capacity["calls"],
+            "peak_memory_bytes": memory.get(operation),
+        }
+    return {"size": size, "seed_seconds": seed_seconds, "operations": operations}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the budgeting data paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000],
+                        help="table sizes to seed (1M is only practical against DynamoDB Local)")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=5, help="iterations per session")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    recorder = CapacityRecorder()
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "backend": os.getenv("DYNAMODB_ENDPOINT_URL") or "moto",
+        "sessions": args.sessions,
+        "iterations": args.iterations,
+        "runs": [],
+    }
+    for size in args.sizes:
+        run = run_size(size, args.sessions, args.iterations, recorder)
+        results["runs"].append(run)
+        print(f"\n{size} expenses (seeded in {run['seed_seconds']:.1f} s)")
+        print(f"{'operation':<30}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RCU':>10}{'WCU':>10}")
+        for operation, stats in run["operations"].items():
+            print(f"{operation:<30}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+                  f"{stats['read_capacity_units']:>10.1f}{stats['write_capacity_units']:>10.1f}")
+
+    # Höchster Speicherverbrauch des ganzen Prozesses (Linux: KiB)
+    results["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Gemeinsame Vorbereitung der Benchmarks: lokale DynamoDB (DYNAMODB_ENDPOINT_URL oder moto)
+# synthetische Ausgaben über alle zwölf Projekte und das Anlegen der Tabellen. Muss vor db importiert werden.
+import os
+import random
+import sys
+import threading
+
+os.environ.setdefault("AWS_REGION", "eu-central-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+if not os.getenv("DYNAMODB_ENDPOINT_URL"):
+    from moto import mock_aws
+
+    mock_aws().start()  # vor dem Import von db, damit die Resource schon abgefangen wird
+
+import config  # noqa: E402
+
+PROJECT_NAMES = list(config.USER_NAMES.values())
+
+
+def synthetic_rows(count, seed=0):
+    rng = random.Random(seed)
+    rows = {project: [] for project in PROJECT_NAMES}
+    for i in range(count):
+        exact = rng.random() < 0.5
+        rows[PROJECT_NAMES[i % len(PROJECT_NAMES)]].append({
+            "title": f"Expense {i}",
+            "description": "Synthetic benchmark expense",
+            "date": rng.choice([f"2025-0{rng.randint(3, 6)}-{rng.randint(10, 28)}", "unknown", None]),
+            "exact_amount": round(rng.uniform(10, 5000), 2) if exact else None,
+            "estimated": None if exact else round(rng.uniform(10, 5000), 2),
+            "conservative": None if exact else round(rng.uniform(10, 6000), 2),
+            "worst_case": None if exact else round(rng.uniform(10, 8000), 2),
+            "priority": rng.randint(1, 5),
+        })
+    return rows
+
+
+def create_tables():
+    import db  # erst hier, damit moto schon läuft
+
+    db.create_expense_table()
+    db.create_counter_table()
+    db.create_summary_table()
+    serialize_moto_transactions()
+
+
+def serialize_moto_transactions():
+    # moto kopiert zu Beginn jeder Transaktion die ganzen Tabellen und setzt sie bei einem Abbruch auf
+    # diese Kopie zurück. Gleichzeitige Transaktionen scheitern deshalb beim Kopieren ("dictionary
+    # changed size during iteration") oder verwerfen, was andere Threads in der Zwischenzeit
+    # geschrieben haben. DynamoDB selbst tut das nicht; gegen moto laufen Transaktionen nacheinander.
+    if os.getenv("DYNAMODB_ENDPOINT_URL"):
+        return
+    import db
+
+    client, lock = db.dynamodb.meta.client, threading.Lock()
+    transact_write_items = client.transact_write_items
+    if getattr(transact_write_items, "serialized", False):
+        return  # schon umschlossen, z. B. bei jedem reset_tables() von bench_suite
+
+    def serialized(**kwargs):
+        with lock:
+            return transact_write_items(**kwargs)
+
+    serialized.serialized = True
+    client.transact_write_items = serialized
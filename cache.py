@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    # Prozessweiter Cache (von allen Sitzungen geteilt) mit Ablaufzeit und
+    # Größenbegrenzung: ist er voll, fliegt der am längsten nicht benutzte Eintrag raus.
+    #
+    # Generationen pro Gruppe (z. B. Projekt) schützen vor veralteten Einträgen: wer lädt, liest vorher
+    # generation(group) und gibt sie bei put mit. Wurde die Gruppe in der Zwischenzeit invalidiert,
+    # wird das Geladene nicht gespeichert.
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # Schlüssel -> (Ablaufzeitpunkt, Wert)
+        self._lock = threading.Lock()
+        self._generations = {}  # Gruppe -> Anzahl Invalidierungen
+        self._cleared = 0  # Anzahl Invalidierungen aller Einträge
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        # Gibt None zurück, wenn der Eintrag fehlt oder abgelaufen ist
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, group):
+        with self._lock:
+            return self._cleared, self._generations.get(group, 0)
+
+    def put(self, key, value, group=None, generation=None):
+        # Mit group: nur speichern, wenn die Gruppe seit generation nicht invalidiert wurde
+        with self._lock:
+            if group is not None and (self._cleared, self._generations.get(group, 0)) != generation:
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, match=None, group=None):
+        # Entfernt alle Einträge, deren Schlüssel match(key) erfüllt (ohne match: alle), und beginnt
+        # eine neue Generation der Gruppe (ohne group: aller Gruppen)
+        with self._lock:
+            if group is None:
+                self._cleared += 1
+            else:
+                self._generations[group] = self._generations.get(group, 0) + 1
+            for key in [key for key in self._entries if match is None or match(key)]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "max_entries": self.max_entries, "ttl": self.ttl}
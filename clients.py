@@ -0,0 +1,74 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+import instrumentation
+
+# Verbindungs-Einstellungen für DynamoDB, alle per Umgebungsvariable anpassbar
+DYNAMODB_ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL")  # z. B. http://localhost:8000 für DynamoDB Local
+MAX_POOL_CONNECTIONS = int(os.getenv("OIKOS_MAX_POOL_CONNECTIONS", "25"))
+MAX_ATTEMPTS = int(os.getenv("OIKOS_MAX_ATTEMPTS", "5"))
+CONNECT_TIMEOUT = float(os.getenv("OIKOS_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("OIKOS_READ_TIMEOUT", "10"))
+
+# Threads für gleichzeitige DynamoDB-Aufrufe aus app()
+CONCURRENT_CALLS = int(os.getenv("OIKOS_CONCURRENT_CALLS", "8"))
+
+_lock = threading.Lock()
+_resources = {}  # Endpoint -> DynamoDB-Resource, eine pro Prozess
+_executor = None
+
+
+def client_config():
+    # Adaptive Retries drosseln bei Throttling selbst, der Pool erlaubt parallele Scans
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        retries={"mode": "adaptive", "total_max_attempts": MAX_ATTEMPTS},
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+    )
+
+
+def get_dynamodb(endpoint_url=None):
+    # Die Resource wird einmal pro Prozess (und Endpoint) erstellt und danach wiederverwendet,
+    # damit Verbindungen im Pool über alle Sitzungen und Reruns hinweg offen bleiben
+    endpoint_url = endpoint_url or DYNAMODB_ENDPOINT_URL
+    with _lock:
+        if endpoint_url not in _resources:
+            _resources[endpoint_url] = boto3.session.Session().resource(
+                "dynamodb",
+                region_name=os.getenv("AWS_REGION"),
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                endpoint_url=endpoint_url,
+                config=client_config(),
+            )
+            # Zeitmessung und verbrauchte Kapazität pro Aufruf, nur mit OIKOS_INSTRUMENTATION
+            instrumentation.install(_resources[endpoint_url].meta.client)
+        return _resources[endpoint_url]
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CONCURRENT_CALLS, thread_name_prefix="dynamodb")
+        return _executor
+
+
+async def gather(*calls):
+    # Führt blockierende boto3-Aufrufe gleichzeitig im gemeinsamen Thread-Pool aus.
+    # Fehler werden als Exception-Objekt im Ergebnis zurückgegeben, nicht geworfen.
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(loop.run_in_executor(_get_executor(), instrumentation.in_current_context(call))
+                                  for call in calls),
+                                return_exceptions=True)
+
+
+def run_concurrently(*calls):
+    # Synchroner Einstieg für das Streamlit-Skript, das selbst keine Event-Loop hat
+    return asyncio.run(gather(*calls))
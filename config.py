@@ -0,0 +1,62 @@
+import datetime
+import os
+
+# Stammdaten der Projekte an einem Ort: Benutzername -> Projektname, Farbe der Karten und die
+# Umgebungsvariable mit dem Passwort. Nur Standardbibliothek, damit die Login-Seite ohne
+# pandas und boto3 auskommt.
+PROJECTS = {
+    "oikos_conference": {"name": "oikos Conference", "color": "#4386e8", "password_env": "OIKOS_CONFERENCE_PASSWORD"},
+    "oikos_sustainability_week": {"name": "Sustainability Week", "color": "#98CE6B", "password_env": "OIKOS_SUSTAINABILITY_WEEK_PASSWORD"},
+    "oikos_action_days": {"name": "Action Days", "color": "#DDD5C0", "password_env": "OIKOS_ACTION_DAYS_PASSWORD"},
+    "oikos_curriculum_change": {"name": "Curriculum Change", "color": "#EFC9F3", "password_env": "OIKOS_CURRICULUM_CHANGE_PASSWORD"},
+    "oikos_un-dress": {"name": "UN-DRESS", "color": "#A8A8A8", "password_env": "OIKOS_UN_DRESS_PASSWORD"},
+    "oikos_changehub": {"name": "ChangeHub", "color": "#E7B789", "password_env": "OIKOS_CHANGEHUB_PASSWORD"},
+    "oikos_solar": {"name": "oikos Solar", "color": "#7686F7", "password_env": "OIKOS_SOLAR_PASSWORD"},
+    "oikos_catalyst": {"name": "oikos Catalyst", "color": "#82CBF9", "password_env": "OIKOS_CATALYST_PASSWORD"},
+    "oikos_climate_neutral_events": {"name": "Climate Neutral Events", "color": "#759272", "password_env": "OIKOS_CLIMATE_NEUTRAL_EVENTS_PASSWORD"},
+    "oikos_consulting": {"name": "oikos Consulting", "color": "#c75f58", "password_env": "OIKOS_CONSULTING_PASSWORD"},
+    "oikos_sustainable_finance": {"name": "Sustainable Finance", "color": "#DA873C", "password_env": "OIKOS_SUSTAINABLE_FINANCE_PASSWORD"},
+    "oikos_oismak": {"name": "Oismak", "color": "#BCC9DD", "password_env": "OIKOS_OISMAK_PASSWORD"},
+}
+
+# Zuordnung von Benutzernamen zu Projektnamen und von Projektnamen zu Farben
+USER_NAMES = {username: project["name"] for username, project in PROJECTS.items()}
+PROJECT_COLORS = {project["name"]: project["color"] for project in PROJECTS.values()}
+
+
+def password_for(username):
+    # Wird erst beim Login gelesen; fehlt die Variable, ist für diesen Benutzer kein Login möglich
+    project = PROJECTS.get(username)
+    return os.getenv(project["password_env"]) if project else None
+
+
+# Semester: jeder Eintrag gehört zum Semester, in dem er erfasst wurde. Gelesen und geschrieben
+# wird nur im aktiven Semester, ältere Semester werden archiviert (archive.py).
+ACTIVE_SEMESTER = os.getenv("OIKOS_SEMESTER", "FS2025")
+# Einträge von vor der Einführung der Semester (ohne Attribut semester)
+LEGACY_SEMESTER = os.getenv("OIKOS_LEGACY_SEMESTER", "FS2025")
+
+# Letzter Tag für Eingaben pro Semester, ergänzt oder überschrieben durch
+# OIKOS_SEMESTER_DEADLINES, z. B. "HS2025=2025-10-15,FS2026=2026-03-25"
+SEMESTER_DEADLINES = {"FS2025": "2025-03-26"}
+for entry in os.getenv("OIKOS_SEMESTER_DEADLINES", "").split(","):
+    if "=" in entry:
+        semester, deadline = entry.split("=", 1)
+        SEMESTER_DEADLINES[semester.strip()] = deadline.strip()
+
+
+def semester_deadline(semester=None):
+    # Deadline als datetime.date, None falls für das Semester (noch) keine festgelegt ist
+    deadline = SEMESTER_DEADLINES.get(semester or ACTIVE_SEMESTER)
+    return datetime.date.fromisoformat(deadline) if deadline else None
+
+
+# Garantiertes Budget pro Projekt (Gewinn des letzten Semesters) als Vorgabe für die Zuteilung,
+# z. B. OIKOS_PROJECT_BUDGETS="oikos Conference=12000,Action Days=3500"; fehlende Projekte 0
+PROJECT_BUDGETS = {}
+for entry in os.getenv("OIKOS_PROJECT_BUDGETS", "").split(","):
+    if "=" in entry:
+        project, amount = entry.split("=", 1)
+        PROJECT_BUDGETS[project.strip()] = float(amount)
+# Zusätzliches Budget der Leitung über alle Projekte
+BOARD_BUDGET = float(os.getenv("OIKOS_BOARD_BUDGET", "0"))
@@ -0,0 +1,841 @@
+import datetime
+import logging
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, DecimalException
+
+import numpy as np
+import pandas as pd
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+import aggregation
+import clients
+import config
+import instrumentation
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# AWS DynamoDB-Client, einmal pro Prozess (siehe clients.py)
+dynamodb = clients.get_dynamodb()
+
+table_name = "oikos_budgeting"  # Gleicher Tabellenname wie bei der Leitung
+table = dynamodb.Table(table_name)
+
+# Eigene Tabelle für den ID-Zähler (Partition Key "name", Typ String), damit
+# die Tabelle der Leitung keine fremden Einträge enthält
+counter_table_name = os.getenv("OIKOS_COUNTER_TABLE", "oikos_budgeting_counters")
+counter_table = dynamodb.Table(counter_table_name)
+ID_COUNTER_NAME = "expense_id"
+
+# Vorberechnete Summen pro Projekt (Partition Key "project", Sort Key "bucket", beide String)
+summary_table_name = os.getenv("OIKOS_SUMMARY_TABLE", "oikos_budgeting_summaries")
+summary_table = dynamodb.Table(summary_table_name)
+
+# Anzahl IDs, die pro Round Trip reserviert und im Prozess zwischengespeichert werden
+ID_BLOCK_SIZE = int(os.getenv("OIKOS_ID_BLOCK_SIZE", "10"))
+
+# Wie oft eine bereits belegte ID übersprungen wird, bevor aufgegeben wird
+MAX_ID_COLLISIONS = 5
+
+# Anzahl paralleler Scan-Segmente beim Laden der ganzen Tabelle
+SCAN_SEGMENTS = int(os.getenv("OIKOS_SCAN_SEGMENTS", "4"))
+
+# Höchstzahl Schlüssel pro BatchGetItem und Aktionen pro TransactWriteItems (Grenzen von DynamoDB)
+BATCH_GET_LIMIT = 100
+TRANSACTION_LIMIT = 100
+# Felder, die ein Projekt nachträglich ändern darf (der Status gehört der Leitung)
+EDITABLE_FIELDS = ["title", "description", "expense_date", "exact_amount", "estimated", "conservative", "worst_case", "priority"]
+
+# Globale Sekundärindizes, damit jede Sitzung nur die Einträge ihres Projekts liest
+PROJECT_INDEX = "project-index"  # Partition Key "project"
+PROJECT_SEMESTER_INDEX = "project-semester-index"  # Partition Key "project_semester" ("<Projekt>#<Semester>")
+INDEX_KEYS = {
+    PROJECT_INDEX: [("project", "S", "HASH")],
+    PROJECT_SEMESTER_INDEX: [("project_semester", "S", "HASH")],
+}
+# Früher angelegt, aber nie gelesen (sortiert wird in sort_expenses); kostet bei jedem Schreiben
+# Kapazität und wird deshalb von ensure_project_indexes entfernt
+RETIRED_INDEXES = ["project-priority-index"]
+# Wie lange (Sekunden) das Ergebnis der Index-Prüfung pro Prozess gültig ist
+INDEX_CHECK_INTERVAL = 60
+
+EXPENSE_COLUMNS = ["id", "project", "title", "description", "expense_date",
+                   "exact_amount", "estimated", "conservative", "worst_case", "priority", "status"]
+AMOUNT_COLUMNS = ["exact_amount", "estimated", "conservative", "worst_case"]
+CATEGORY_COLUMNS = ["project", "status"]  # Wenige verschiedene Werte, als Kategorie deutlich kleiner
+# Obergrenze pro Betrag (CHF): DynamoDB speichert Zahlen nur bis etwa 1E+126, auch in den Summen
+MAX_AMOUNT = 1_000_000_000
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")  # Einziges gespeichertes Datumsformat neben "unknown"
+
+# Cache der geladenen Einträge pro Projekt, wird bei jedem Schreiben invalidiert
+CACHE_TTL = float(os.getenv("OIKOS_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("OIKOS_CACHE_MAX_ENTRIES", "64"))
+expense_cache = TTLCache(CACHE_TTL, CACHE_MAX_ENTRIES)
+
+_index_status = {}  # Indexname -> (verfügbar, Zeitpunkt der Prüfung)
+
+_id_lock = threading.Lock()
+_id_block = []  # Reservierte, noch nicht vergebene IDs dieses Prozesses
+_last_write = {}  # Projekt -> Zeitpunkt des letzten Schreibens in diesem Prozess
+_summary_errors = {"count": 0, "items": 0, "last_error": None, "last_at": None}  # Siehe _update_summaries
+
+
+def _is_condition_failure(error):
+    return error.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def create_expense_table():
+    # Nur für lokale Umgebungen (DynamoDB Local, moto): Tabelle wie bei der Leitung, samt Projekt-Indizes
+    attributes = {"id": "S"}
+    indexes = []
+    for index_name, keys in INDEX_KEYS.items():
+        attributes.update({name: attribute_type for name, attribute_type, _ in keys})
+        indexes.append({"IndexName": index_name,
+                        "KeySchema": [{"AttributeName": name, "KeyType": key_type} for name, _, key_type in keys],
+                        "Projection": {"ProjectionType": "ALL"}})
+    dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": name, "AttributeType": attribute_type}
+                              for name, attribute_type in attributes.items()],
+        GlobalSecondaryIndexes=indexes,
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+
+
+def create_counter_table():
+    # Einmalig ausführen (oder gegen einen lokalen DynamoDB-Ersatz), legt die Zähler-Tabelle an
+    dynamodb.create_table(
+        TableName=counter_table_name,
+        KeySchema=[{"AttributeName": "name", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "name", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    counter_table.wait_until_exists()
+
+
+def create_summary_table():
+    # Einmalig ausführen, legt die Tabelle für die vorberechneten Summen an
+    dynamodb.create_table(
+        TableName=summary_table_name,
+        KeySchema=[{"AttributeName": "project", "KeyType": "HASH"},
+                   {"AttributeName": "bucket", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "project", "AttributeType": "S"},
+                              {"AttributeName": "bucket", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    summary_table.wait_until_exists()
+
+
+def scan_pages(segment=None, total_segments=None, **kwargs):
+    # Liefert die Tabelle Seite für Seite (je max. 1 MB) und folgt dabei LastEvaluatedKey.
+    # Läuft über den Client der Resource: thread-safe, liefert aber wie die Resource Python-Typen.
+    client = dynamodb.meta.client
+    kwargs["TableName"] = table_name
+    if total_segments:
+        kwargs["Segment"] = segment
+        kwargs["TotalSegments"] = total_segments
+    while True:
+        response = client.scan(**kwargs)
+        yield response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _max_existing_id():
+    # Einmaliger Scan über alle Seiten, nur beim Initialisieren des Zählers
+    highest = 0
+    for page in scan_pages(ProjectionExpression="id"):
+        for item in page:
+            if str(item["id"]).isdigit():
+                highest = max(highest, int(item["id"]))
+    return highest
+
+
+def seed_id_counter():
+    # Setzt den Zähler auf die höchste bestehende ID, falls er fehlt oder zu tief ist.
+    # Die Bedingung macht den Aufruf idempotent, auch wenn mehrere Prozesse gleichzeitig starten.
+    highest = _max_existing_id()
+    try:
+        counter_table.update_item(
+            Key={"name": ID_COUNTER_NAME},
+            UpdateExpression="SET next_id = :highest",
+            ConditionExpression="attribute_not_exists(next_id) OR next_id < :highest",
+            ExpressionAttributeValues={":highest": highest},
+        )
+    except ClientError as error:
+        if not _is_condition_failure(error):
+            raise
+
+
+def _reserve_id_block(size):
+    # Atomares ADD auf dem Zähler: reserviert die IDs (neuer Wert - size, neuer Wert]
+    try:
+        response = counter_table.update_item(
+            Key={"name": ID_COUNTER_NAME},
+            UpdateExpression="ADD next_id :size",
+            ConditionExpression="attribute_exists(next_id)",
+            ExpressionAttributeValues={":size": size},
+            ReturnValues="UPDATED_NEW",
+        )
+    except ClientError as error:
+        if not _is_condition_failure(error):
+            raise
+        # Zähler existiert noch nicht: zuerst aus den bestehenden IDs initialisieren
+        seed_id_counter()
+        return _reserve_id_block(size)
+
+    upper = int(response["Attributes"]["next_id"])
+    return [str(expense_id) for expense_id in range(upper - size + 1, upper + 1)]
+
+
+def allocate_expense_ids(count):
+    # Gibt count eindeutige IDs zurück; ein voller Block kostet einen einzigen Round Trip
+    with _id_lock:
+        if len(_id_block) < count:
+            _id_block.extend(_reserve_id_block(max(ID_BLOCK_SIZE, count - len(_id_block))))
+        ids = _id_block[:count]
+        del _id_block[:count]
+    return ids
+
+
+def next_expense_id():
+    return allocate_expense_ids(1)[0]
+
+
+def validate_expense(title, description, date, exact_amount, estimated, conservative, worst_case, priority):
+    # Dieselben Regeln wie im Formular, gibt eine Liste mit Fehlermeldungen zurück (leer = gültig)
+    errors = []
+    if not title or not description:
+        errors.append("Both Title and Description are mandatory fields!")
+    if date not in [None, "unknown"] and not _is_iso_date(date):
+        errors.append("The date must be empty, 'unknown' or a date in the format YYYY-MM-DD.")
+    estimates = [estimated, conservative, worst_case]
+    if exact_amount is not None and any(amount is not None for amount in estimates):
+        errors.append("Enter either the exact amount or the three estimates, not both.")
+    elif exact_amount is None and any(amount is None for amount in estimates):
+        errors.append("Enter either the exact amount or all three estimates (estimated, conservative, worst-case).")
+    if any(amount is not None and (not math.isfinite(amount) or amount < 0) for amount in [exact_amount] + estimates):
+        errors.append("Amounts must be positive numbers.")
+    elif any(amount is not None and amount > MAX_AMOUNT for amount in [exact_amount] + estimates):
+        errors.append(f"Amounts must not exceed CHF {MAX_AMOUNT:,}.")
+    if priority is None or not math.isfinite(priority) or priority != int(priority) or not 1 <= priority <= 5:
+        errors.append("The priority must be a whole number from 1 to 5.")
+    return errors
+
+
+def _is_iso_date(value):
+    # Nur YYYY-MM-DD: fromisoformat akzeptiert seit Python 3.11 auch 20250401 oder 2025-W14-2,
+    # die beim Sortieren und in den Summen nach Datum als "ohne Datum" gelten würden
+    if not ISO_DATE.fullmatch(str(value)):
+        return False
+    try:
+        datetime.date.fromisoformat(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def now_iso():
+    # UTC mit fester Länge, damit Zeitstempel als Text korrekt sortieren
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def project_semester(project, semester):
+    return f"{project}#{semester}"
+
+
+def build_expense_item(expense_id, project, title, description, date, exact_amount, estimated, conservative, worst_case, priority,
+                       semester=None):
+    # Erstelle das Item mit den richtigen Datentypen, im aktiven Semester
+    semester = semester or config.ACTIVE_SEMESTER
+    item = {
+        "id": expense_id,
+        "project": project,
+        "title": title,
+        "description": description,
+        "expense_date": str(date) if date else None,
+        "exact_amount": str(exact_amount) if exact_amount else None,
+        "estimated": str(estimated) if estimated else None,
+        "conservative": str(conservative) if conservative else None,
+        "worst_case": str(worst_case) if worst_case else None,
+        "priority": int(priority) if priority else None,
+        "status": "not assigned",  # Projekte können den Status nicht ändern
+        "updated_at": now_iso(),  # Wasserstand für inkrementelle Snapshots (snapshot.py)
+        "semester": semester,
+        "project_semester": project_semester(project, semester),  # Schlüssel des Semester-Index
+    }
+    # Ohne Priorität fehlt das Attribut ganz (wie nach apply_changes), statt NULL zu sein
+    if item["priority"] is None:
+        del item["priority"]
+    return item
+
+
+def _update_summaries(items, sign=1):
+    # Für Batches: die Einträge sind zu diesem Zeitpunkt schon gespeichert; schlägt das Nachführen
+    # der Summen fehl (z. B. länger gedrosselt als die Retries von botocore oder ein Betrag, den
+    # boto3 nicht als DynamoDB-Zahl darstellen kann), soll das Speichern nicht als fehlgeschlagen
+    # erscheinen. Der Fehler wird protokolliert und auf der Debug-Seite angezeigt, die Abweichung
+    # lässt sich mit rebuild_summaries() beheben.
+    try:
+        aggregation.apply_items(summary_table, items, sign)
+    except (ClientError, DecimalException, TypeError) as error:
+        _summary_errors["count"] += 1
+        _summary_errors["items"] += len(items)
+        _summary_errors["last_error"] = f"{type(error).__name__}: {error}"
+        _summary_errors["last_at"] = now_iso()
+        logger.warning("Summary update for %d item(s) failed, totals are off until rebuild_summaries(): %s",
+                       len(items), error)
+
+
+def summary_errors():
+    # Fehlgeschlagene Nachführungen der Summen seit dem Start des Prozesses
+    return dict(_summary_errors)
+
+
+def _write_with_summaries(action, items, sign=1):
+    # Ein einzelner Eintrag und die ADDs auf seine drei Buckets in einer Transaktion:
+    # entweder ist beides gespeichert oder nichts
+    dynamodb.meta.client.transact_write_items(
+        TransactItems=[action] + aggregation.transaction_updates(summary_table_name, items, sign))
+
+
+def _cancelled_by_condition(error):
+    # Transaktion abgebrochen, weil die Bedingung der ersten Aktion (des Eintrags) nicht erfüllt war
+    if error.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+        return False
+    reasons = error.response.get("CancellationReasons") or [{}]
+    return reasons[0].get("Code") == "ConditionalCheckFailed"
+
+
+def put_expense(item):
+    # Bedingtes Schreiben: ein bestehender Eintrag wird nie überschrieben.
+    # Ist die ID schon belegt (z. B. von Hand angelegt), wird die nächste genommen.
+    for _ in range(MAX_ID_COLLISIONS):
+        try:
+            _write_with_summaries({"Put": {"TableName": table_name, "Item": item,
+                                           "ConditionExpression": "attribute_not_exists(id)"}}, [item])
+            invalidate_project(item["project"])
+            return item["id"]
+        except ClientError as error:
+            if not _cancelled_by_condition(error):
+                raise
+            item = dict(item, id=next_expense_id())
+    raise RuntimeError("Could not find a free expense ID, please try again.")
+
+
+def insert_expense(project, title, description, date, exact_amount, estimated, conservative, worst_case, priority):
+    item = build_expense_item(next_expense_id(), project, title, description, date,
+                              exact_amount, estimated, conservative, worst_case, priority)
+    return put_expense(item)
+
+
+def put_expenses_batch(items):
+    # Mehrere Einträge in Batches à 25 schreiben. BatchWriteItem kennt keine Bedingungen,
+    # die IDs stammen deshalb alle aus dem atomaren Zähler und sind garantiert frei.
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+    for project in {item["project"] for item in items}:
+        invalidate_project(project)
+    _update_summaries(items)
+    return [item["id"] for item in items]
+
+
+def _put_submission(item):
+    # Schreibt einen Eintrag aus der Warteschlange (outbox.py) samt Summen höchstens einmal. Ist die ID
+    # schon belegt, entscheidet submission_key, ob es ein früherer Versuch derselben Eingabe war;
+    # dessen Summen sind mit dem Eintrag in derselben Transaktion gespeichert worden.
+    try:
+        _write_with_summaries({"Put": {"TableName": table_name, "Item": item,
+                                       "ConditionExpression": "attribute_not_exists(id)"}}, [item])
+        return "written"
+    except ClientError as error:
+        if not _cancelled_by_condition(error):
+            raise
+        existing = table.get_item(Key={"id": item["id"]}, ConsistentRead=True).get("Item", {})
+        return "exists" if existing.get("submission_key") == item["submission_key"] else "collision"
+
+
+def put_submissions(items):
+    # Mehrere Einträge gleichzeitig schreiben, jeder mit Bedingung. Gibt pro ID "written", "exists"
+    # (früher schon geschrieben), "collision" (ID von einem fremden Eintrag belegt) oder die
+    # Exception zurück. Auch bei "exists" wird der Cache geleert: ging die Antwort auf den früheren
+    # Versuch verloren, hat ihn niemand geleert.
+    calls = [lambda item=item: _put_submission(item) for item in items]
+    results = clients.run_concurrently(*calls) if calls else []
+    saved = [item for item, result in zip(items, results) if result in ("written", "exists")]
+    for project in {item["project"] for item in saved}:
+        invalidate_project(project)
+    return {item["id"]: result for item, result in zip(items, results)}
+
+
+def delete_expense(expense_id, project):
+    # Löscht den Eintrag nur, solange er unverändert ist, zusammen mit seinem Anteil an den Summen.
+    # Ändert ihn jemand dazwischen, wird neu gelesen und nochmals versucht.
+    for _ in range(MAX_ID_COLLISIONS):
+        item = table.get_item(Key={"id": str(expense_id)}, ConsistentRead=True).get("Item")
+        if item is None or item["project"] != project:
+            return
+        try:
+            _write_with_summaries({"Delete": {"TableName": table_name, "Key": {"id": item["id"]},
+                                              **_unchanged_condition(item, project)}}, [item], sign=-1)
+            invalidate_project(project)
+            return
+        except ClientError as error:
+            if not _cancelled_by_condition(error):
+                raise
+    raise RuntimeError("The expense was changed while deleting it, please try again.")
+
+
+def get_expenses(expense_ids):
+    # Mehrere Einträge mit einem BatchGetItem pro 100 IDs; nicht verarbeitete Schlüssel
+    # (bei Drosselung) werden mit kurzer Pause nachgeholt
+    client = dynamodb.meta.client
+    expense_ids = [str(expense_id) for expense_id in dict.fromkeys(expense_ids)]
+    items = []
+    for start in range(0, len(expense_ids), BATCH_GET_LIMIT):
+        request = {table_name: {"Keys": [{"id": expense_id} for expense_id in expense_ids[start:start + BATCH_GET_LIMIT]],
+                                "ConsistentRead": True}}
+        attempt = 0
+        while request:
+            if attempt:
+                time.sleep(min(0.05 * 2 ** attempt, 2))
+            response = client.batch_get_item(RequestItems=request)
+            items.extend(response["Responses"].get(table_name, []))
+            request = response.get("UnprocessedKeys")
+            attempt += 1
+    return items
+
+
+def ownership_errors(expense_ids, items, project, semester=None):
+    # Prüft serverseitig, ob alle IDs existieren, zum Projekt und zum (aktiven) Semester gehören
+    items = {str(item["id"]): item for item in items}
+    missing = [expense_id for expense_id in expense_ids if str(expense_id) not in items]
+    foreign = [expense_id for expense_id in expense_ids
+               if str(expense_id) in items and items[str(expense_id)]["project"] != project]
+    archived = [expense_id for expense_id in expense_ids if str(expense_id) in items and semester
+                and aggregation.semester_of(items[str(expense_id)]) != semester]
+    errors = []
+    if missing:
+        errors.append(f"No expense found with ID {', '.join(map(str, missing))}.")
+    if foreign:
+        errors.append(f"You can only change expenses from your own project (ID {', '.join(map(str, foreign))}).")
+    if archived:
+        errors.append(f"You can only change expenses of the current semester (ID {', '.join(map(str, archived))}).")
+    return errors
+
+
+def _unchanged_condition(item, project):
+    # Nur Einträge des eigenen Projekts, und nur solange sie seit dem Lesen unverändert sind;
+    # damit stimmen auch die Änderungen an den Summen
+    names = {"#project": "project"}
+    values = {":me": project}
+    if "updated_at" in item:
+        values[":seen"] = item["updated_at"]
+        condition = "#project = :me AND updated_at = :seen"
+    else:
+        condition = "#project = :me AND attribute_not_exists(updated_at)"
+    return {"ConditionExpression": condition, "ExpressionAttributeNames": names, "ExpressionAttributeValues": values}
+
+
+def apply_changes(project, delete_ids, updates, semester=None):
+    # Löscht und ändert mehrere Einträge: ein BatchGetItem für die Prüfung, danach ein
+    # TransactWriteItems pro 100 Aktionen, jede Aktion mit der Bedingung project = :me.
+    # updates: ID -> Felder wie bei insert_expense (title, description, date, ...).
+    # Jeder Block ist atomar; scheitert einer, sind die vorherigen bereits gespeichert.
+    delete_ids = [str(expense_id) for expense_id in delete_ids]
+    updates = {str(expense_id): values for expense_id, values in updates.items() if str(expense_id) not in delete_ids}
+    items = {item["id"]: item for item in get_expenses(delete_ids + list(updates))}
+    errors = ownership_errors(delete_ids + list(updates), items.values(), project, semester)
+    if errors:
+        raise ValueError(" ".join(errors))
+
+    actions = []  # (Aktion, bisheriges Item, neues Item oder None)
+    for expense_id in delete_ids:
+        old = items[expense_id]
+        actions.append(({"Delete": {"TableName": table_name, "Key": {"id": expense_id}, **_unchanged_condition(old, project)}},
+                        old, None))
+    for expense_id, values in updates.items():
+        old = items[expense_id]
+        built = build_expense_item(expense_id, project, semester=aggregation.semester_of(old), **values)
+        fields = [field for field in EDITABLE_FIELDS if field in built] + ["updated_at"]
+        condition = _unchanged_condition(old, project)
+        update = {
+            "TableName": table_name,
+            "Key": {"id": expense_id},
+            "UpdateExpression": "SET " + ", ".join(f"#{field} = :{field}" for field in fields)
+                                + ("" if "priority" in built else " REMOVE #priority"),
+            "ConditionExpression": condition["ConditionExpression"],
+            "ExpressionAttributeNames": {**condition["ExpressionAttributeNames"],
+                                         **{f"#{field}": field for field in fields + ["priority"]}},
+            "ExpressionAttributeValues": {**condition["ExpressionAttributeValues"],
+                                          **{f":{field}": built[field] for field in fields}},
+        }
+        new = {**{key: value for key, value in old.items() if key != "priority"}, **{field: built[field] for field in fields}}
+        actions.append(({"Update": update}, old, new))
+
+    client = dynamodb.meta.client
+    for start in range(0, len(actions), TRANSACTION_LIMIT):
+        chunk = actions[start:start + TRANSACTION_LIMIT]
+        try:
+            client.transact_write_items(TransactItems=[action for action, _, _ in chunk])
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                raise
+            raise RuntimeError("Some of the selected expenses were changed or deleted in the meantime. "
+                               "Please reload the page and try again.") from error
+        finally:
+            invalidate_project(project)
+        _update_summaries([old for _, old, _ in chunk], sign=-1)
+        _update_summaries([new for _, _, new in chunk if new is not None])
+    return {"deleted": len(delete_ids), "updated": len(updates)}
+
+
+def _propose_status(expense_id, status, open_statuses):
+    # Setzt den Status nur, solange die Leitung noch nicht endgültig entschieden hat
+    values = {f":open{number}": value for number, value in enumerate(open_statuses)}
+    try:
+        response = table.update_item(
+            Key={"id": str(expense_id)},
+            UpdateExpression="SET #status = :status, updated_at = :now",
+            ConditionExpression=f"attribute_exists(id) AND (attribute_not_exists(#status) OR #status IN ({', '.join(values)}))",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues={":status": status, ":now": now_iso(), **values},
+            ReturnValues="ALL_OLD",
+        )
+    except ClientError as error:
+        if not _is_condition_failure(error):
+            raise
+        return None
+    return response["Attributes"]
+
+
+def propose_statuses(proposals, open_statuses):
+    # proposals: ID -> vorgeschlagener Status. Ein bedingtes UpdateItem pro Eintrag, parallel über
+    # clients.run_concurrently; Einträge mit endgültigem Status werden übersprungen.
+    # Gibt die Anzahl geänderter Einträge zurück.
+    calls = [lambda expense_id=expense_id, status=status: _propose_status(expense_id, status, open_statuses)
+             for expense_id, status in proposals.items()]
+    results = clients.run_concurrently(*calls) if calls else []
+    old_items = [result for result in results if isinstance(result, dict)]
+    for project in {item["project"] for item in old_items}:
+        invalidate_project(project)
+    _update_summaries(old_items, sign=-1)
+    _update_summaries([dict(item, status=proposals[item["id"]]) for item in old_items])
+    # Fehler erst nach dem Nachführen der Summen für die bereits gespeicherten Einträge
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        raise errors[0]
+    return len(old_items)
+
+
+def load_summary(project=None, semester=None):
+    # Vorberechnete Summen eines Projekts (ohne Projekt: aller Projekte), ohne Scan der Einträge;
+    # mit Semester nur dessen Buckets
+    return aggregation.load(summary_table, project, semester)
+
+
+def cached_summary(project, semester=None):
+    # Liegt im selben Cache wie die Einträge und wird mit ihnen invalidiert
+    key = (project, "summary", semester)
+    summary = expense_cache.get(key)
+    if summary is None:
+        generation = expense_cache.generation(project)
+        summary = load_summary(project, semester)
+        expense_cache.put(key, summary, project, generation)
+    return summary
+
+
+def rebuild_summaries():
+    # Vollständiger Neuaufbau aus einem Scan, nur nötig falls die Summen abweichen
+    df, _ = load_expenses()
+    aggregation.rebuild(summary_table, df)
+
+
+def _page_frame(page):
+    # Eine Seite ohne Typ-Erkennung als DataFrame: fehlende Attribute werden NaN, NULL bleibt None,
+    # damit die Umwandlung unten genau dieselben Werte liefert wie die frühere Schleife pro Item
+    return pd.DataFrame(page, dtype=object)
+
+
+def _to_number(values):
+    # float(...) pro Wert, aber spaltenweise in NumPy; None und "" gelten als leer
+    values = values.to_numpy(dtype=object)
+    return np.where((values == None) | (values == ""), np.nan, values).astype("float64")  # noqa: E711
+
+
+def _to_string(values):
+    # str(...) pro Wert, aber spaltenweise; NULL wird wie bisher zu "None"
+    values = values.to_numpy(dtype=object)
+    return pd.Series(np.where(values == None, "None", values), dtype=object).astype(str)  # noqa: E711
+
+
+def pages_to_expenses(frames):
+    # Fügt die Seiten einmal zusammen und konvertiert dann jede Spalte als Ganzes
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=EXPENSE_COLUMNS)
+
+    with instrumentation.phase("dataframe construction"):
+        df = pd.concat(frames, ignore_index=True)
+
+        # Fehlende Spalten hinzufügen
+        for col in EXPENSE_COLUMNS:
+            if col not in df.columns:
+                df[col] = np.nan
+
+    # Setze Datentypen explizit
+    with instrumentation.phase("type coercion"):
+        data = {}
+        for col in EXPENSE_COLUMNS:
+            if col in AMOUNT_COLUMNS:
+                data[col] = _to_number(df[col])
+            elif col == "priority":
+                data[col] = pd.array(_to_number(df[col]), dtype="Int64")  # Int64 erlaubt auch NaN
+            elif col in CATEGORY_COLUMNS:
+                data[col] = _to_string(df[col]).astype("category")
+            else:
+                data[col] = _to_string(df[col])
+        for col in df.columns.difference(EXPENSE_COLUMNS):
+            data[col] = df[col].infer_objects()
+        return pd.DataFrame(data)
+
+
+def _collect_pages(pages, stats):
+    # Jede Seite wird direkt in ein DataFrame umgewandelt, statt zuerst alle Items zu sammeln
+    collected = []
+    for page in pages:
+        stats["pages"] += 1
+        stats["items"] += len(page)
+        with instrumentation.phase("page frames"):
+            collected.append(_page_frame(page))
+    return collected
+
+
+def _scan_segment(segment, total_segments, stats, **kwargs):
+    return _collect_pages(scan_pages(segment, total_segments, **kwargs), stats)
+
+
+def load_expenses(total_segments=None, **kwargs):
+    # Lädt die ganze Tabelle vollständig (alle Seiten), bei total_segments > 1 als paralleler Scan.
+    # Gibt das DataFrame und Kennzahlen zum Scan zurück.
+    total_segments = total_segments or SCAN_SEGMENTS
+    start = time.perf_counter()
+    segment_stats = [{"pages": 0, "items": 0} for _ in range(total_segments)]
+
+    if total_segments > 1:
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            futures = [executor.submit(instrumentation.in_current_context(_scan_segment), segment, total_segments, segment_stats[segment], **kwargs)
+                       for segment in range(total_segments)]
+            pages = [page for future in futures for page in future.result()]
+    else:
+        pages = _scan_segment(None, None, segment_stats[0], **kwargs)
+
+    df = pages_to_expenses(pages)
+    stats = {
+        "items": sum(s["items"] for s in segment_stats),
+        "pages": sum(s["pages"] for s in segment_stats),
+        "segments": total_segments,
+        "seconds": time.perf_counter() - start,
+    }
+    return df, stats
+
+
+def query_pages(index_name, key_condition, **kwargs):
+    # Wie scan_pages, aber nur über eine Partition (Projekt oder Projekt und Semester) eines Sekundärindex
+    client = dynamodb.meta.client
+    kwargs["TableName"] = table_name
+    kwargs["IndexName"] = index_name
+    kwargs["KeyConditionExpression"] = key_condition
+    while True:
+        response = client.query(**kwargs)
+        yield response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _active_indexes():
+    description = dynamodb.meta.client.describe_table(TableName=table_name)["Table"]
+    return {index["IndexName"]: index["IndexStatus"] for index in description.get("GlobalSecondaryIndexes", [])}
+
+
+def index_available(index_name):
+    # Prüft (gecacht pro Prozess), ob der Index existiert und fertig aufgebaut ist
+    available, checked_at = _index_status.get(index_name, (False, None))
+    if checked_at is None or time.monotonic() - checked_at > INDEX_CHECK_INTERVAL:
+        try:
+            available = _active_indexes().get(index_name) == "ACTIVE"
+        except ClientError:
+            available = False
+        _index_status[index_name] = (available, time.monotonic())
+    return available
+
+
+def sort_expenses(df, sort_by):
+    # Datumsangaben können "unknown" oder leer sein und taugen daher nicht als Indexschlüssel,
+    # sie werden nach dem Laden sortiert (Einträge ohne Datum zuletzt)
+    if sort_by == "expense_date":
+        return df.sort_values("expense_date", key=lambda dates: dates.where(dates.str.match(r"\d{4}-"), "~"),
+                              kind="stable", ignore_index=True)
+    if sort_by == "priority":
+        return df.sort_values("priority", kind="stable", na_position="last", ignore_index=True)
+    return df
+
+
+def semester_filter(semester):
+    # Einträge ohne Semester gehören zum Semester vor dessen Einführung
+    condition = Attr("semester").eq(semester)
+    if semester == config.LEGACY_SEMESTER:
+        condition = condition | Attr("semester").not_exists()
+    return condition
+
+
+def load_project_expenses(project, sort_by=None, semester=None):
+    # Liest nur die Einträge eines Projekts über den Index, sortiert optional nach
+    # "priority" oder "expense_date" (nach dem Laden). Der Priority-Index ist spärlich: Einträge
+    # ohne Priorität fehlen dort, er wird deshalb nicht zum Lesen verwendet. Mit Semester wird nur dessen
+    # Partition im Semester-Index gelesen, ohne diesen Index wird im Projekt-Index gefiltert.
+    # Fehlt auch der Projekt-Index, wird wie bisher gescannt, mit serverseitigem Filter.
+    start = time.perf_counter()
+    stats = {"pages": 0, "items": 0}
+    if semester and index_available(PROJECT_SEMESTER_INDEX):
+        index_name = PROJECT_SEMESTER_INDEX
+        key_condition = Key("project_semester").eq(project_semester(project, semester))
+        query_kwargs = {}
+    else:
+        index_name = PROJECT_INDEX if index_available(PROJECT_INDEX) else None
+        key_condition = Key("project").eq(project)
+        query_kwargs = {"FilterExpression": semester_filter(semester)} if semester else {}
+
+    if index_name:
+        try:
+            df = pages_to_expenses(_collect_pages(query_pages(index_name, key_condition, **query_kwargs), stats))
+            source = index_name
+        except ClientError as error:
+            # Index wurde inzwischen gelöscht: merken und auf den Scan ausweichen
+            if error.response.get("Error", {}).get("Code") != "ValidationException":
+                raise
+            _index_status[index_name] = (False, time.monotonic())
+            return load_project_expenses(project, sort_by, semester)
+    else:
+        condition = Attr("project").eq(project)
+        if semester:
+            condition = condition & semester_filter(semester)
+        df, stats = load_expenses(FilterExpression=condition)
+        source = "scan"
+
+    df = sort_expenses(df, sort_by)
+
+    stats = {"items": stats["items"], "pages": stats["pages"], "source": source,
+             "seconds": time.perf_counter() - start}
+    return df, stats
+
+
+def ensure_project_indexes(wait=True):
+    # Migration: entfernt ausgediente und legt fehlende Projekt-Indizes an. DynamoDB erlaubt nur
+    # eine Index-Änderung pro UpdateTable, deshalb wird jeweils gewartet, bis sie abgeschlossen ist.
+    # Bestehende Einträge werden von DynamoDB automatisch in den Index übernommen.
+    client = dynamodb.meta.client
+    for index_name in RETIRED_INDEXES:
+        if _active_indexes().get(index_name) in [None, "DELETING"]:
+            continue
+        client.update_table(TableName=table_name, GlobalSecondaryIndexUpdates=[{"Delete": {"IndexName": index_name}}])
+        while wait and index_name in _active_indexes():
+            time.sleep(5)
+    for index_name, keys in INDEX_KEYS.items():
+        description = client.describe_table(TableName=table_name)["Table"]
+        if index_name in {index["IndexName"] for index in description.get("GlobalSecondaryIndexes", [])}:
+            continue
+
+        index = {
+            "IndexName": index_name,
+            "KeySchema": [{"AttributeName": name, "KeyType": key_type} for name, _, key_type in keys],
+            "Projection": {"ProjectionType": "ALL"},
+        }
+        if description.get("BillingModeSummary", {}).get("BillingMode") != "PAY_PER_REQUEST":
+            throughput = description["ProvisionedThroughput"]
+            index["ProvisionedThroughput"] = {"ReadCapacityUnits": throughput["ReadCapacityUnits"],
+                                              "WriteCapacityUnits": throughput["WriteCapacityUnits"]}
+        client.update_table(
+            TableName=table_name,
+            AttributeDefinitions=[{"AttributeName": name, "AttributeType": attribute_type}
+                                  for name, attribute_type, _ in keys],
+            GlobalSecondaryIndexUpdates=[{"Create": index}],
+        )
+        while wait and _active_indexes().get(index_name) != "ACTIVE":
+            time.sleep(5)
+    _index_status.clear()
+
+
+def backfill_semesters(semester=None):
+    # Migration: Einträge von vor der Einführung der Semester bekommen das Semester
+    # (Standard: OIKOS_LEGACY_SEMESTER) und den Schlüssel des Semester-Index.
+    # Danach rebuild_summaries(), damit auch die Summen nach Semester getrennt sind.
+    semester = semester or config.LEGACY_SEMESTER
+    updated = 0
+    for page in scan_pages(ProjectionExpression="id, #project", ExpressionAttributeNames={"#project": "project"},
+                           FilterExpression=Attr("semester").not_exists()):
+        for item in page:
+            try:
+                table.update_item(
+                    Key={"id": item["id"]},
+                    UpdateExpression="SET semester = :semester, project_semester = :project_semester",
+                    ConditionExpression="attribute_exists(id) AND attribute_not_exists(semester)",
+                    ExpressionAttributeValues={":semester": semester,
+                                               ":project_semester": project_semester(item["project"], semester)},
+                )
+                updated += 1
+            except ClientError as error:
+                # Inzwischen gelöscht oder schon nachgetragen
+                if not _is_condition_failure(error):
+                    raise
+    return updated
+
+
+def migrate_semesters(wait=True):
+    # Alle Schritte der Umstellung auf Semester, in dieser Reihenfolge
+    updated = backfill_semesters()
+    ensure_project_indexes(wait)
+    rebuild_summaries()
+    expense_cache.invalidate()
+    return updated
+
+
+def invalidate_project(project):
+    # Wird bei jedem Schreiben aufgerufen; der Zeitpunkt entscheidet, ob ein Snapshot noch aktuell ist
+    _last_write[project] = time.time()
+    expense_cache.invalidate(lambda key: key[0] == project, group=project)
+
+
+def last_write(project):
+    # Letztes Schreiben dieses Prozesses für das Projekt (Unix-Zeit), 0 falls keines
+    return _last_write.get(project, 0)
+
+
+def cached_project_expenses(project, sort_by=None, semester=None):
+    # Wie load_project_expenses, aber aus dem prozessweiten Cache, solange dieser gültig ist.
+    # Das DataFrame wird zwischen Sitzungen geteilt und darf nicht verändert werden.
+    key = (project, sort_by, semester)
+    cached = expense_cache.get(key)
+    if cached is not None:
+        df, stats = cached
+        return df, dict(stats, cached=True)
+    # Ein Schreiben während des Ladens (z. B. durch die Warteschlange) verhindert das Speichern im Cache
+    generation = expense_cache.generation(project)
+    df, stats = load_project_expenses(project, sort_by, semester)
+    expense_cache.put(key, (df, stats), project, generation)
+    return df, dict(stats, cached=False)
+
+
+def cache_stats():
+    return expense_cache.stats()
@@ -0,0 +1,130 @@
+import datetime
+
+import pandas as pd
+
+import db
+
+# Spalten der Import-Datei, in derselben Reihenfolge wie im Formular
+IMPORT_COLUMNS = ["title", "description", "date", "exact_amount", "estimated", "conservative", "worst_case", "priority"]
+AMOUNT_FIELDS = ["exact_amount", "estimated", "conservative", "worst_case"]
+
+
+def template_csv():
+    # Leere Vorlage mit zwei Beispielzeilen zum Herunterladen
+    example = pd.DataFrame([
+        ["Venue", "Rent for the conference venue", "2025-04-10", 1200, None, None, None, 1],
+        ["Catering", "Lunch for 80 participants", "unknown", None, 1500, 1800, 2200, 2],
+    ], columns=IMPORT_COLUMNS, dtype=object)
+    return example.to_csv(index=False).encode()
+
+
+def read_expense_file(uploaded_file):
+    # CSV oder Excel (.xlsx), alle Zellen zunächst als Text bzw. wie in Excel erfasst
+    name = uploaded_file.name.lower()
+    if name.endswith(".xlsx"):
+        df = pd.read_excel(uploaded_file, dtype=object)
+    elif name.endswith(".csv"):
+        df = pd.read_csv(uploaded_file, dtype=str, keep_default_na=False)
+    else:
+        raise ValueError("Please upload a .csv or .xlsx file.")
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    missing = [col for col in IMPORT_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return df[IMPORT_COLUMNS]
+
+
+def _is_empty(value):
+    # pd.isna auch für pd.NA aus Int64-Spalten des Editors
+    return value is None or (not isinstance(value, str) and pd.isna(value)) or str(value).strip() == ""
+
+
+def _parse_date(value):
+    # Leer = kein Datum, "unknown" = Datum unbekannt, sonst YYYY-MM-DD (Excel liefert Datumsobjekte)
+    if _is_empty(value):
+        return None
+    if isinstance(value, (datetime.date, pd.Timestamp)):
+        return value.strftime('%Y-%m-%d')
+    value = str(value).strip()
+    return "unknown" if value.lower() == "unknown" else value
+
+
+def _parse_row(row, errors):
+    values = {"title": None if _is_empty(row["title"]) else str(row["title"]).strip(),
+              "description": None if _is_empty(row["description"]) else str(row["description"]).strip(),
+              "date": _parse_date(row["date"])}
+    for field in AMOUNT_FIELDS + ["priority"]:
+        if _is_empty(row[field]):
+            values[field] = None
+            continue
+        try:
+            values[field] = float(str(row[field]).strip().replace("'", ""))  # 1'200 wie in der Schweiz üblich
+        except ValueError:
+            errors.append(f"'{row[field]}' is not a valid number for {field}.")
+            values[field] = None
+    return values
+
+
+def _validated(df):
+    # Prüft jede Zeile mit denselben Regeln wie das Formular: (Index, Werte, Fehlermeldungen)
+    for index, row in df.iterrows():
+        errors = []
+        values = _parse_row(row, errors)
+        if not errors:
+            errors = db.validate_expense(**values)
+        yield index, values, errors
+
+
+def validate_rows(df):
+    # Gibt die gültigen Zeilen und einen Fehlerbericht (eine Zeile pro fehlerhafter Zeile
+    # der Datei) zurück.
+    valid, report = [], []
+    for index, values, errors in _validated(df):
+        if errors:
+            # +2: Kopfzeile und Zählung ab 1, damit die Nummer der Zeile in Excel entspricht
+            report.append({"row": index + 2, "title": values["title"], "errors": " ".join(errors)})
+        else:
+            valid.append(values)
+    return valid, pd.DataFrame(report, columns=["row", "title", "errors"])
+
+
+def editor_frame(expenses):
+    # Einträge für st.data_editor: eine Spalte zum Löschen, danach dieselben Felder wie beim Import.
+    # Fehlende Texte ("None", "nan") werden leer, damit sie als leer geprüft werden.
+    frame = pd.DataFrame({"delete": False, "id": expenses["id"].astype(str)})
+    for col in ["title", "description"]:
+        frame[col] = expenses[col].astype(str).where(~expenses[col].astype(str).isin(["None", "nan"]), "")
+    dates = expenses["expense_date"].astype(str)
+    frame["date"] = dates.where(~dates.isin(["None", "nan"]), "")
+    for col in AMOUNT_FIELDS:
+        frame[col] = expenses[col].astype("float64")
+    frame["priority"] = expenses["priority"].astype("Int64")
+    frame["status"] = expenses["status"].astype(str)
+    return frame.reset_index(drop=True)
+
+
+def changed_rows(original, edited):
+    # Zeilen, deren Felder im Editor geändert wurden (ohne die zum Löschen markierten), Index = ID
+    before = original.set_index("id")[IMPORT_COLUMNS]
+    after = edited.set_index("id")
+    after = after.loc[~after["delete"], IMPORT_COLUMNS]
+    before = before.loc[after.index]
+    different = _comparable(before) != _comparable(after)
+    return after[different.any(axis=1)]
+
+
+def _comparable(frame):
+    # Leere Zellen (NaN, pd.NA, None) als "", alles andere als Text
+    return frame.astype(object).where(frame.notna(), "").astype(str)
+
+
+def validate_edits(rows):
+    # Wie validate_rows, aber für geänderte Zeilen aus dem Editor: ID -> Werte und ein
+    # Fehlerbericht mit der ID statt der Zeilennummer
+    valid, report = {}, []
+    for expense_id, values, errors in _validated(rows):
+        if errors:
+            report.append({"id": expense_id, "title": values["title"], "errors": " ".join(errors)})
+        else:
+            valid[expense_id] = values
+    return valid, pd.DataFrame(report, columns=["id", "title", "errors"])
@@ -0,0 +1,178 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+# Messungen pro Rerun: Zeiten der einzelnen Phasen von app() und jeder DynamoDB-Aufruf.
+# Ausgeschaltet (Standard) kostet phase() nur eine Abfrage und es werden keine Hooks registriert.
+ENABLED = os.getenv("OIKOS_INSTRUMENTATION", "").lower() in ["1", "true", "yes"]
+TRACE_FILE = os.getenv("OIKOS_TRACE_FILE")  # Optional: jede Zusammenfassung als JSON-Zeile anhängen
+MAX_TRACES = int(os.getenv("OIKOS_MAX_TRACES", "200"))
+
+READ_OPERATIONS = {"GetItem", "Query", "Scan", "BatchGetItem", "TransactGetItems", "DescribeTable"}
+
+_NULL_CONTEXT = contextlib.nullcontext()
+_current = contextvars.ContextVar("oikos_trace", default=None)
+_lock = threading.Lock()
+recent_traces = deque(maxlen=MAX_TRACES)  # Zusammenfassungen der letzten Reruns im Prozess
+
+
+class Trace:
+    def __init__(self, user):
+        self.user = user
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.phases = []  # (Name, Sekunden)
+        self.calls = []  # ein dict pro DynamoDB-Aufruf
+        self._lock = threading.Lock()  # Phasen und Aufrufe können aus Hilfs-Threads kommen
+
+    def add_phase(self, name, seconds):
+        with self._lock:
+            self.phases.append((name, seconds))
+
+    def add_call(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+    def summary(self):
+        phases = defaultdict(float)
+        for name, seconds in self.phases:
+            phases[name] += seconds
+        operations = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "items": 0, "capacity_units": 0.0})
+        for call in self.calls:
+            operation = operations[call["operation"]]
+            operation["calls"] += 1
+            operation["seconds"] += call["seconds"]
+            operation["items"] += call["items"]
+            operation["capacity_units"] += call["capacity_units"]
+        return {
+            "timestamp": self.started_at,
+            "user": self.user,
+            "total_seconds": time.perf_counter() - self.start,
+            "phases": dict(phases),
+            "dynamodb": dict(operations),
+            "calls": list(self.calls),
+        }
+
+
+@contextlib.contextmanager
+def _timed_phase(trace, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_phase(name, time.perf_counter() - start)
+
+
+def phase(name):
+    # with instrumentation.phase("render cards"): ... misst die Dauer im aktuellen Rerun
+    if not ENABLED:
+        return _NULL_CONTEXT
+    trace = _current.get()
+    return _NULL_CONTEXT if trace is None else _timed_phase(trace, name)
+
+
+@contextlib.contextmanager
+def rerun(user):
+    # Umschliesst einen ganzen Rerun von app(); am Ende wird die Zusammenfassung abgelegt
+    if not ENABLED:
+        yield None
+        return
+    trace = Trace(user)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        summary = trace.summary()
+        recent_traces.append(summary)
+        if TRACE_FILE:
+            with _lock, open(TRACE_FILE, "a") as trace_file:
+                trace_file.write(json.dumps(summary, default=str) + "\n")
+
+
+def in_current_context(call):
+    # Für Aufrufe in anderen Threads: übernimmt den laufenden Rerun, damit deren Phasen
+    # und DynamoDB-Aufrufe im richtigen Trace landen
+    if not ENABLED:
+        return call
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(call, *args, **kwargs)
+
+
+def _request_capacity(params, model, **kwargs):
+    if "ReturnConsumedCapacity" in model.input_shape.members:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+
+def _before_call(context, **kwargs):
+    context["oikos_start"] = time.perf_counter()
+
+
+def _after_call(parsed, model, context, **kwargs):
+    trace = _current.get()
+    if trace is None or "oikos_start" not in context:
+        return
+    consumed = parsed.get("ConsumedCapacity") or []
+    consumed = consumed if isinstance(consumed, list) else [consumed]
+    items = parsed.get("Count")
+    if items is None:
+        items = len(parsed.get("Items", [])) or int("Item" in parsed or "Attributes" in parsed)
+    trace.add_call({
+        "operation": model.name,
+        "kind": "read" if model.name in READ_OPERATIONS else "write",
+        "seconds": time.perf_counter() - context["oikos_start"],
+        "items": items,
+        "capacity_units": float(sum(entry.get("CapacityUnits", 0) for entry in consumed)),
+    })
+
+
+def install(client):
+    # Registriert die botocore-Hooks auf dem (einmal pro Prozess erstellten) DynamoDB-Client
+    if not ENABLED:
+        return
+    client.meta.events.register("provide-client-params.dynamodb.*", _request_capacity)
+    client.meta.events.register("before-call.dynamodb.*", _before_call)
+    client.meta.events.register("after-call.dynamodb.*", _after_call)
+
+
+def to_json_lines(traces=None):
+    traces = recent_traces if traces is None else traces
+    return "".join(json.dumps(summary, default=str) + "\n" for summary in list(traces))
+
+
+def to_prometheus(traces=None):
+    # Aufsummierte Werte aller gespeicherten Reruns im Textformat von Prometheus
+    traces = recent_traces if traces is None else traces
+    phases = defaultdict(lambda: [0.0, 0])
+    operations = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "items": 0, "capacity_units": 0.0})
+    reruns = [0.0, 0]
+    for summary in list(traces):
+        reruns[0] += summary["total_seconds"]
+        reruns[1] += 1
+        for name, seconds in summary["phases"].items():
+            phases[name][0] += seconds
+            phases[name][1] += 1
+        for name, values in summary["dynamodb"].items():
+            for key, value in values.items():
+                operations[name][key] += value
+
+    lines = ["# TYPE oikos_rerun_seconds summary",
+             f"oikos_rerun_seconds_sum {reruns[0]}", f"oikos_rerun_seconds_count {reruns[1]}",
+             "# TYPE oikos_phase_seconds summary"]
+    for name, (seconds, count) in sorted(phases.items()):
+        lines += [f'oikos_phase_seconds_sum{{phase="{name}"}} {seconds}',
+                  f'oikos_phase_seconds_count{{phase="{name}"}} {count}']
+    lines += ["# TYPE oikos_dynamodb_calls_total counter"]
+    lines += [f'oikos_dynamodb_calls_total{{operation="{name}"}} {values["calls"]}' for name, values in sorted(operations.items())]
+    lines += ["# TYPE oikos_dynamodb_call_seconds_total counter"]
+    lines += [f'oikos_dynamodb_call_seconds_total{{operation="{name}"}} {values["seconds"]}' for name, values in sorted(operations.items())]
+    lines += ["# TYPE oikos_dynamodb_items_total counter"]
+    lines += [f'oikos_dynamodb_items_total{{operation="{name}"}} {values["items"]}' for name, values in sorted(operations.items())]
+    lines += ["# TYPE oikos_dynamodb_consumed_capacity_total counter"]
+    lines += [f'oikos_dynamodb_consumed_capacity_total{{operation="{name}"}} {values["capacity_units"]}'
+              for name, values in sorted(operations.items())]
+    return "\n".join(lines) + "\n"
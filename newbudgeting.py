@@ -1,109 +1,47 @@
-import pandas as pd
 import streamlit as st
-import psycopg2
 import hashlib
+import hmac
 import os
 import datetime
-import boto3
-
-# AWS DynamoDB-Client initialisieren
-dynamodb = boto3.resource(
-    "dynamodb",
-    region_name=os.getenv("AWS_REGION"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-)
-
-table_name = "oikos_budgeting"  # Gleicher Tabellenname wie bei der Leitung
-table = dynamodb.Table(table_name)
-
-# Benutzer und gehashte Passwörter
-users = {
-    "oikos_conference": hashlib.sha256(os.getenv("OIKOS_CONFERENCE_PASSWORD").encode()).hexdigest(),
-    "oikos_sustainability_week": hashlib.sha256(os.getenv("OIKOS_SUSTAINABILITY_WEEK_PASSWORD").encode()).hexdigest(),
-    "oikos_action_days": hashlib.sha256(os.getenv("OIKOS_ACTION_DAYS_PASSWORD").encode()).hexdigest(),
-    "oikos_curriculum_change": hashlib.sha256(os.getenv("OIKOS_CURRICULUM_CHANGE_PASSWORD").encode()).hexdigest(),
-    "oikos_un-dress": hashlib.sha256(os.getenv("OIKOS_UN_DRESS_PASSWORD").encode()).hexdigest(),
-    "oikos_changehub": hashlib.sha256(os.getenv("OIKOS_CHANGEHUB_PASSWORD").encode()).hexdigest(),
-    "oikos_solar": hashlib.sha256(os.getenv("OIKOS_SOLAR_PASSWORD").encode()).hexdigest(),
-    "oikos_catalyst": hashlib.sha256(os.getenv("OIKOS_CATALYST_PASSWORD").encode()).hexdigest(),
-    "oikos_climate_neutral_events": hashlib.sha256(os.getenv("OIKOS_CLIMATE_NEUTRAL_EVENTS_PASSWORD").encode()).hexdigest(),
-    "oikos_consulting": hashlib.sha256(os.getenv("OIKOS_CONSULTING_PASSWORD").encode()).hexdigest(),
-    "oikos_sustainable_finance": hashlib.sha256(os.getenv("OIKOS_SUSTAINABLE_FINANCE_PASSWORD").encode()).hexdigest(),
-    "oikos_oismak": hashlib.sha256(os.getenv("OIKOS_OISMAK_PASSWORD").encode()).hexdigest(),
-}
-
-# Zuordnung von Benutzernamen zu Projektnamen
-user_names = {
-    "oikos_conference": "oikos Conference",
-    "oikos_sustainability_week": "Sustainability Week",
-    "oikos_action_days": "Action Days",
-    "oikos_curriculum_change": "Curriculum Change",
-    "oikos_un-dress": "UN-DRESS",
-    "oikos_changehub": "ChangeHub",
-    "oikos_solar": "oikos Solar",
-    "oikos_catalyst": "oikos Catalyst",
-    "oikos_climate_neutral_events": "Climate Neutral Events",
-    "oikos_consulting": "oikos Consulting",
-    "oikos_sustainable_finance": "Sustainable Finance",
-    "oikos_oismak": "Oismak"
-}
+
+import config
+import instrumentation
+
+# Benutzer mit Zugriff auf die versteckten Seiten (?debug=1, ?allocation=1), durch Kommas getrennt
+ADMIN_USERS = [user.strip() for user in os.getenv("OIKOS_ADMIN_USERS", "").split(",") if user.strip()]
 
 def app():
     project_name = st.session_state["user"]
     
-    if project_name == "oikos Conference":
-        color = "#4386e8"
-    elif project_name == "Sustainability Week":
-        color = "#98CE6B"
-    elif project_name == "Action Days":
-        color = "#DDD5C0"
-    elif project_name == "Curriculum Change":
-        color = "#EFC9F3"
-    elif project_name == "UN-DRESS":
-        color = "#A8A8A8"
-    elif project_name == "ChangeHub":
-        color = "#E7B789"
-    elif project_name == "oikos Solar":
-        color = "#7686F7"
-    elif project_name == "oikos Catalyst":
-        color = "#82CBF9"
-    elif project_name == "Climate Neutral Events":
-        color = "#759272"
-    elif project_name == "oikos Consulting":
-        color = "#c75f58"
-    elif project_name == "Sustainable Finance":
-        color = "#DA873C"
-    elif project_name == "Oismak":
-        color = "#BCC9DD"
-
-
-    # Funktion zum Einfügen der Daten in die PostgreSQL-Datenbank
+    color = render.project_color(project_name)
+    store = storage.get_store()  # DynamoDB oder PostgreSQL, je nach OIKOS_STORAGE_BACKEND
+
+    # Aktives Semester und dessen Deadline (config.py bzw. OIKOS_SEMESTER, OIKOS_SEMESTER_DEADLINES)
+    semester = config.ACTIVE_SEMESTER
+    deadline = config.semester_deadline(semester)
+    current_date = datetime.date.today()
+    submissions_open = deadline is None or current_date <= deadline
+    if deadline is None:
+        deadline_text = "The board will announce the deadline for this semester."
+    else:
+        deadline_text = (f"You can enter and modify expenses until (and including) **{deadline.strftime('%B')} {deadline.day}, {deadline.year}**. "
+                         "After this deadline, you will still be able to view your expenses, but no further changes or submissions will be allowed.")
+
+    # Neue Eingaben gehen in die lokale Warteschlange (outbox.py), ein Hintergrund-Thread speichert sie
+    outbox.start_worker(store)
+
+    # Funktion zum Einfügen der Daten: bestätigt sofort, ohne auf die Datenbank zu warten
     def insert_expense(title, description, date, exact_amount, estimated, conservative, worst_case, priority):
         try:
-            # Generiere eine fortlaufende ID
-            response = table.scan(ProjectionExpression="id")
-            existing_ids = [int(item["id"]) for item in response.get("Items", []) if item["id"].isdigit()]
-            expense_id = str(max(existing_ids) + 1) if existing_ids else "1"
-    
-            # Erstelle das Item mit den richtigen Datentypen
-            expense_item = {
-                "id": expense_id,
-                "project": project_name,
-                "title": title,
-                "description": description,
-                "expense_date": str(date) if date else None,
-                "exact_amount": str(exact_amount) if exact_amount else None,
-                "estimated": str(estimated) if estimated else None,
-                "conservative": str(conservative) if conservative else None,
-                "worst_case": str(worst_case) if worst_case else None,
-                "priority": int(priority) if priority else None,
-                "status": "not assigned"  # Projekte können den Status nicht ändern
-            }
-    
-            # Eintrag in DynamoDB speichern
-            table.put_item(Item=expense_item)
-            st.success(f"Expense successfully saved!")
+            row = dict(title=title, description=description, date=date, exact_amount=exact_amount, estimated=estimated,
+                       conservative=conservative, worst_case=worst_case, priority=priority, semester=semester)
+            # Derselbe Schlüssel, bis sich die Eingabe ändert: ein zweiter Klick auf Submit (auch erst
+            # im nächsten Rerun) ergibt keinen zweiten Eintrag
+            if st.session_state.get("submitted_row") != (project_name, row):
+                st.session_state["submission_key"] = outbox.new_key()
+                st.session_state["submitted_row"] = (project_name, row)
+            outbox.submit(project_name, row, key=st.session_state["submission_key"])
+            st.success("Expense received! It is shown as pending below until it has been saved.")
     
         except Exception as error:
             st.error(f"Error saving expense: {error}")
@@ -112,11 +50,12 @@ def app():
     # Streamlit Form für die Eingabe
     st.title("Hey oikee!")
     st.subheader(f"Welcome to the oikos budgeting tool. You are logged in as {project_name}")
+    st.caption(f"Semester {semester}")
     st.write("")
     st.write("")
 
     with st.expander("Instructions"):
-        st.markdown("""
+        st.markdown(f"""
         This tool helps you submit upcoming expenses for board approval. Each project is guaranteed funding up to the profit made last semester. However, please submit all foreseeable expenses, not just those exceeding your budget, so the board can allocate funds effectively. This also allows the board to potentially help reduce costs by negotiating better offers or managing expenses collectively.
         
         **Categorizing Expenses:**  
@@ -133,26 +72,24 @@ def app():
         **Entering a New Expense:**  
         To add an expense, fill in the mandatory fields for the title and description. Specify if the expense has a known date, and if so, enter it. For exact costs, input the amount directly. For estimated expenses, select "Estimation" and enter the estimated, conservative, and worst-case values.
 
+        If you have many expenses, you can also download the template under "Import several expenses from a CSV or Excel file", fill in one row per expense and upload it. Rows with errors are listed and not imported.
+
         Set the priority of your expense (1 being the highest). **Note:** Priority helps you organize your expenses and guides the board’s efforts to optimize overall project spending, but it does not guarantee approval. Be honest in assessing what’s most important for your project.
 
-        After submitting an expense, click on the "Refresh to view changes" button to see your updates.
+        Your submitted expenses appear in the overview right away, marked as pending until they have been saved. The overview and totals only show expenses of the current semester ({semester}).
 
-        **Deleting an Expense:**  
-        If you need to delete an expense, enter the ID of the expense and click the "Check" button to view the details. Once confirmed, you can click "Delete" to remove the entry.
+        **Editing and Deleting Expenses:**  
+        Under "Edit or delete expenses", tick "Delete" for every expense you want to remove, or change the title, description, date, amounts or priority directly in the table. Click "Apply changes" to save everything at once. The status is set by the board and cannot be changed.
 
         **Expense Submission Deadline:**  
-        You can enter and modify expenses until (and including) **March 26, 2025**. After this deadline, you will still be able to view your expenses, but no further changes or submissions will be allowed.
+        {deadline_text}
         """)
 
 
     st.write("")
 
-    # Festgelegte Deadline (26.03.2025)
-    deadline = datetime.date(2025, 3, 26)
-    current_date = datetime.date.today()
-
     # Überprüfen, ob das aktuelle Datum vor oder gleich der Deadline liegt
-    if current_date <= deadline:
+    if submissions_open:
 
         st.write("")
 
@@ -208,13 +145,38 @@ def app():
 
         # Überprüfen, ob beide Pflichtfelder ausgefüllt sind
         if st.button("Submit"):
-            if title and description:
+            errors = db.validate_expense(title, description, date, exact_amount, estimated, conservative, worst_case, priority)
+            if not errors:
+                # Die Eingabe erscheint weiter unten sofort als wartende Karte
                 insert_expense(title, description, date, exact_amount, estimated, conservative, worst_case, priority)
-                # Füge einen Button hinzu, um die App neu zu laden
-                if st.button("Refresh to view changes"):
-                    st.rerun()  # Lädt die App neu, ohne dass sich der Benutzer erneut einloggen muss
             else:
-                st.error("Both Title and Description are mandatory fields!")
+                for error in errors:
+                    st.error(error)
+
+        # Mehrere Ausgaben auf einmal aus einer CSV- oder Excel-Datei importieren
+        with st.expander("Import several expenses from a CSV or Excel file"):
+            st.write("One row per expense. Leave the date empty if it is not associated with a specific date, "
+                     "write 'unknown' if the date is not known yet. Fill in either the exact amount or all three estimates.")
+            st.download_button("Download template", importer.template_csv(), file_name="expenses_template.csv", mime="text/csv")
+            uploaded_file = st.file_uploader("Upload your file", type=["csv", "xlsx"])
+
+            if uploaded_file is not None:
+                try:
+                    valid_rows, report = importer.validate_rows(importer.read_expense_file(uploaded_file))
+                except Exception as error:
+                    st.error(f"Error reading file: {error}")
+                    valid_rows, report = [], None
+
+                if report is not None and not report.empty:
+                    st.warning(f"{len(report)} row(s) contain errors and will not be imported:")
+                    st.dataframe(report, hide_index=True)
+
+                if valid_rows and st.button(f"Import {len(valid_rows)} valid expense(s)"):
+                    try:
+                        store.import_expenses(project_name, valid_rows)
+                        st.success(f"{len(valid_rows)} expense(s) successfully imported!")
+                    except Exception as error:
+                        st.error(f"Error importing expenses: {error}")
 
     else:
         st.write(f"The deadline for submitting expenses has passed. No more expenses can be entered after {deadline}.")
@@ -224,128 +186,86 @@ def app():
 
 
     # Funktion zum Laden der Daten aus der Datenbank
-    def load_data_from_db():
+    def load_data_from_db(result):
         try:
-            response = table.scan()
-            data = response.get("Items", [])
-    
-            if not data:
-                return pd.DataFrame(columns=["id", "project", "title", "description", "expense_date", 
-                                             "exact_amount", "estimated", "conservative", "worst_case", "priority", "status"])
-    
-            # Konvertiere Werte in die richtigen Datentypen
-            for item in data:
-                if 'exact_amount' in item:
-                    item['exact_amount'] = float(item['exact_amount']) if item['exact_amount'] not in [None, ""] else None
-                if 'estimated' in item:
-                    item['estimated'] = float(item['estimated']) if item['estimated'] not in [None, ""] else None
-                if 'conservative' in item:
-                    item['conservative'] = float(item['conservative']) if item['conservative'] not in [None, ""] else None
-                if 'worst_case' in item:
-                    item['worst_case'] = float(item['worst_case']) if item['worst_case'] not in [None, ""] else None
-                if 'priority' in item:
-                    item['priority'] = int(item['priority']) if item['priority'] not in [None, ""] else None
-                if 'id' in item:
-                    item['id'] = str(item['id'])
-                if 'project' in item:
-                    item['project'] = str(item['project'])
-                if 'title' in item:
-                    item['title'] = str(item['title'])
-                if 'description' in item:
-                    item['description'] = str(item['description'])
-                if 'expense_date' in item:
-                    item['expense_date'] = str(item['expense_date'])
-                if 'status' in item:
-                    item['status'] = str(item['status'])
-    
-            df = pd.DataFrame(data)
-    
-            # Fehlende Spalten hinzufügen
-            required_columns = ["id", "project", "title", "description", "expense_date", 
-                                "exact_amount", "estimated", "conservative", "worst_case", "priority", "status"]
-            for col in required_columns:
-                if col not in df.columns:
-                    df[col] = None
-    
-            # Setze Datentypen explizit
-            df = df.astype({
-                "id": str,
-                "project": str,
-                "title": str,
-                "description": str,
-                "expense_date": str,
-                "exact_amount": "float64",
-                "estimated": "float64",
-                "conservative": "float64",
-                "worst_case": "float64",
-                "priority": "Int64",  # Int64 erlaubt auch NaN
-                "status": str
-            }, errors="ignore")
-    
+            # result stammt aus store.load_project_expenses: nur die Einträge des eigenen Projekts
+            # (Index-Query, ohne Index gefilterter Scan), zwischengespeichert bis zum nächsten Schreiben
+            if isinstance(result, Exception):
+                raise result
+            df, stats = result
+            st.session_state["load_stats"] = stats
             return df
     
         except Exception as e:
-            st.error(f"Error connecting to DynamoDB: {e}")
-            return pd.DataFrame()
+            st.error(f"Error connecting to the database: {e}")
+            return pd.DataFrame(columns=db.EXPENSE_COLUMNS)
 
     
 
-    # Calls DF
-    df = load_data_from_db()
+    # Wartende Eingaben vor den gespeicherten lesen: eine Eingabe, die dazwischen gespeichert wird,
+    # erscheint so höchstens doppelt (und wird unten herausgefiltert), aber nie gar nicht
+    pending_entries = outbox.pending(project_name, semester)
 
-    df_projectspecific = df[df['project'] == project_name]
+    # Einträge und Summen sind unabhängig voneinander und werden gleichzeitig geladen
+    with instrumentation.phase("load"):
+        expenses_result, summary_result = clients.run_concurrently(
+            lambda: store.load_project_expenses(project_name, semester=semester),
+            lambda: store.scenario_totals(project_name, semester=semester),
+        )
+
+    # Calls DF
+    df_projectspecific = load_data_from_db(expenses_result)
 
     st.write("")
     st.write("")
     st.write("")
 
     st.header("Expenses Overview")
+    if "load_stats" in st.session_state:
+        stats = st.session_state["load_stats"]
+        source = f"from {stats['source']}" if str(stats.get("source")).startswith("snapshot") else f"({stats['pages']} pages)"
+        st.caption(f"Loaded {stats['items']} expenses {source} in {stats['seconds']:.2f} s"
+                   + (" (cached)" if stats.get("cached") else ""))
     st.write("")
 
+    # Vorberechnete Summen des Projekts je Szenario (exakte Beträge plus jeweilige Schätzung)
+    try:
+        if isinstance(summary_result, Exception):
+            raise summary_result
+        totals = summary_result
+        if not totals.empty:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total (exact + estimated)", f"CHF {totals['exact_plus_estimated'].sum():,.2f}")
+            col2.metric("Total (exact + conservative)", f"CHF {totals['exact_plus_conservative'].sum():,.2f}")
+            col3.metric("Total (exact + worst case)", f"CHF {totals['exact_plus_worst_case'].sum():,.2f}")
+            st.write("")
+    except Exception as error:
+        st.error(f"Error loading budget totals: {error}")
+
+    saved_ids = set(df_projectspecific["id"].astype(str))
+    pending_entries = [entry for entry in pending_entries if entry["id"] not in saved_ids]
+    # Nicht gespeicherte Eingaben wegen eines nicht vorübergehenden Fehlers: werden nicht wiederholt
+    failed_entries = [entry for entry in pending_entries if entry["status"] == "failed, not saved"]
+    for entry in failed_entries:
+        st.error(f"Expense '{entry['title']}' could not be saved and will not be retried: {entry['last_error']}. "
+                 "Please submit it again with corrected values.")
+    if len(pending_entries) > len(failed_entries):
+        st.caption(f"{len(pending_entries) - len(failed_entries)} expense(s) received but not saved yet. They are saved "
+                   "in the background and included in the totals once saved.")
+    if pending_entries:
+        st.markdown(render.pending_cards_html(pending_entries, color), unsafe_allow_html=True)
+
     # Stelle sicher, dass der DataFrame nicht leer ist
     if not df_projectspecific.empty:
-        # Durchlaufe alle Einträge im DataFrame
-        for i in range(0, len(df_projectspecific), 3):  # Schleife in Schritten von 3
-
-            # Erstelle drei Spalten
-            cols = st.columns(3)
-
-            # Für jeden Eintrag in den nächsten drei Daten, fülle die Spalten
-            for j, col in enumerate(cols):
-                if i + j < len(df_projectspecific):  # Überprüfe, ob der Index gültig ist
-                    entry = df_projectspecific.iloc[i + j]
-                    
-                    if entry['exact_amount'] and entry['exact_amount'] > 0:
-                        # Container-Inhalt als HTML-Markdown
-                        container_content = f"""
-                        <div style='background-color: {color}; padding: 15px; border-radius: 10px; margin-bottom: 10px;'>
-                            <p>id: {entry['id']}</p>
-                            <h4>{entry['title']}</h4>
-                            <p>{entry['description']}</p>
-                            <p><strong>Date: </strong>{entry['expense_date']}</p>
-                            <p><strong>Amount:</strong> CHF {entry['exact_amount']}</p>
-                            <p><strong>Priority:</strong> {entry['priority']}</p>
-                            <p><strong>Status:</strong> {entry['status']}</p>
-                        </div>
-                        """
-                        # Den gesamten Container in der Spalte anzeigen
-                        col.markdown(container_content, unsafe_allow_html=True)
-                    else:
-                        # Container-Inhalt als HTML-Markdown
-                        container_content = f"""
-                        <div style='background-color: {color}; padding: 15px; border-radius: 10px; margin-bottom: 10px;'>
-                            <p>id: {entry['id']}</p>
-                            <h4>{entry['title']}</h4>
-                            <p>{entry['description']}</p>
-                            <p><strong>Date: </strong>{entry['expense_date']}</p>
-                            <p><strong>Amount:</strong> CHF {entry['exact_amount'] if entry['exact_amount'] and entry['exact_amount'] > 0 else (f"{entry['estimated']} / {entry['conservative']} / {entry['worst_case']}" if entry['estimated'] and entry['conservative'] and entry['worst_case'] else 'N/A')}</p>
-                            <p><strong>Priority:</strong> {entry['priority']}</p>
-                            <p><strong>Status:</strong> {entry['status']}</p>
-                        </div>
-                        """
-                        # Den gesamten Container in der Spalte anzeigen
-                        col.markdown(container_content, unsafe_allow_html=True)
-    else:
+        # Alle Karten einer Seite werden in einem einzigen Markdown-Aufruf ausgegeben
+        page = 1
+        pages = render.page_count(df_projectspecific)
+        if pages > 1:
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1)
+        with instrumentation.phase("render cards"):
+            cards = render.cards_html(df_projectspecific, color, page)
+        st.markdown(cards, unsafe_allow_html=True)
+    elif not pending_entries:
         st.write("No data available for the selected project.")
 
 
@@ -353,89 +273,160 @@ def app():
     st.write("")
     st.write("")
 
-    # Funktion zum Löschen eines Eintrags
-    def delete_expense_by_id(expense_id):
+    # Mehrere Einträge auf einmal löschen oder direkt in der Tabelle ändern. Geprüft und
+    # gespeichert wird serverseitig in einem Zug (ein Lesen, ein Schreiben pro 100 Einträge).
+    if submissions_open and not df_projectspecific.empty:
+        st.write("")
+        st.subheader("Edit or delete expenses")
+        if "manage_message" in st.session_state:
+            st.success(st.session_state.pop("manage_message"))
+        st.write("Tick 'Delete' for the expenses you want to remove, or change the values directly in the table. "
+                 "Nothing is saved until you click 'Apply changes'.")
+
+        # Nach dem Speichern bekommt der Editor einen neuen Schlüssel und startet mit den neuen Daten
+        editor_version = st.session_state.setdefault("editor_version", 0)
+        original = importer.editor_frame(df_projectspecific)
+        edited = st.data_editor(
+            original,
+            key=f"expense_editor_{editor_version}",
+            hide_index=True,
+            disabled=["id", "status"],
+            column_config={
+                "delete": st.column_config.CheckboxColumn("Delete"),
+                "date": st.column_config.TextColumn("date", help="YYYY-MM-DD, 'unknown' or empty if not associated with a date"),
+                "priority": st.column_config.NumberColumn("priority", min_value=1, max_value=5, step=1),
+            },
+        )
+        delete_ids = edited.loc[edited["delete"], "id"].tolist()
+        changed = importer.changed_rows(original, edited)
+
+        if delete_ids or not changed.empty:
+            if st.button(f"Apply changes ({len(delete_ids)} to delete, {len(changed)} edited)"):
+                updates, report = importer.validate_edits(changed)
+                if not report.empty:
+                    st.error("Some edited expenses are not valid, nothing was saved:")
+                    st.dataframe(report, hide_index=True)
+                else:
+                    try:
+                        result = store.apply_changes(project_name, delete_ids, updates, semester)
+                        # Die Übersicht steht weiter oben, deshalb direkt neu laden und die Meldung danach anzeigen
+                        st.session_state["manage_message"] = (f"{result['deleted']} expense(s) deleted, "
+                                                              f"{result['updated']} expense(s) updated.")
+                        st.session_state["editor_version"] = editor_version + 1
+                        st.rerun()
+                    except Exception as error:
+                        st.error(f"Error saving changes: {error}")
+
+
+
+
+# Versteckte Debug-Seite: Messungen der letzten Reruns dieses Prozesses
+def debug_page():
+    st.title("Debug")
+    # Unabhängig von der Instrumentierung: fehlgeschlagene Nachführungen der Summen
+    errors = db.summary_errors()
+    if errors["count"]:
+        st.warning(f"{errors['count']} summary update(s) for {errors['items']} expense(s) failed since the start of "
+                   f"this process, last at {errors['last_at']}: {errors['last_error']}. The budget totals are off "
+                   "until db.rebuild_summaries() is run.")
+    if not instrumentation.ENABLED:
+        st.info("Instrumentation is disabled. Set OIKOS_INSTRUMENTATION=1 and restart the app to record reruns.")
+        return
+
+    traces = list(instrumentation.recent_traces)
+    st.write(f"{len(traces)} recorded rerun(s)")
+    if traces:
+        latest = traces[-1]
+        st.subheader("Latest rerun")
+        st.caption(f"{latest['user']}: {latest['total_seconds'] * 1000:.1f} ms in total")
+        st.dataframe(pd.DataFrame([{"phase": name, "ms": seconds * 1000} for name, seconds in latest["phases"].items()]),
+                     hide_index=True)
+        st.dataframe(pd.DataFrame([{"operation": name, **values} for name, values in latest["dynamodb"].items()]),
+                     hide_index=True)
+
+        st.subheader("Recent reruns")
+        st.dataframe(pd.DataFrame([{
+            "time": datetime.datetime.fromtimestamp(summary["timestamp"]).strftime("%H:%M:%S"),
+            "user": summary["user"],
+            "total ms": summary["total_seconds"] * 1000,
+            "dynamodb calls": sum(values["calls"] for values in summary["dynamodb"].values()),
+            "capacity units": sum(values["capacity_units"] for values in summary["dynamodb"].values()),
+        } for summary in reversed(traces)]), hide_index=True)
+
+    st.subheader("Cache")
+    st.json(db.cache_stats())
+
+    st.subheader("Submission queue")
+    st.json(outbox.stats())
+
+    col1, col2 = st.columns(2)
+    col1.download_button("Export as JSON lines", instrumentation.to_json_lines(traces),
+                         file_name="oikos_traces.jsonl", mime="application/jsonl")
+    col2.download_button("Export as Prometheus metrics", instrumentation.to_prometheus(traces),
+                         file_name="oikos_metrics.prom", mime="text/plain")
+
+
+# Versteckte Seite der Leitung (?allocation=1): welche Ausgaben mit welchem Budget finanziert werden
+def allocation_page():
+    st.title("Budget allocation")
+    store = storage.get_store()
+    semester = st.text_input("Semester", value=config.ACTIVE_SEMESTER)
+
+    # Die Einträge werden einmal geladen; das Durchrechnen der Szenarien braucht danach keine Datenbank
+    if st.button("Reload expenses") or st.session_state.get("allocation_semester") != semester:
+        st.session_state["allocation_expenses"], _ = store.load_expenses(semester)
+        # Dieselben Buckets wie in der Summen-Tabelle, aus den geladenen Einträgen berechnet
+        st.session_state["allocation_buckets"] = aggregation.summarize(st.session_state["allocation_expenses"])
+        st.session_state["allocation_semester"] = semester
+    expenses = st.session_state["allocation_expenses"]
+    st.caption(f"{len(expenses)} expense(s) in {semester}")
+
+    scenario = st.radio("Scenario for expenses without an exact amount", allocation.SCENARIOS, horizontal=True)
+    board_budget = st.number_input("Board budget (CHF)", min_value=0.0, value=config.BOARD_BUDGET, step=100.0)
+    budgets = st.data_editor(
+        pd.DataFrame({"project": list(config.PROJECT_COLORS),
+                      "budget": [config.PROJECT_BUDGETS.get(name, 0.0) for name in config.PROJECT_COLORS]}),
+        disabled=["project"], hide_index=True, key="allocation_budgets",
+        column_config={"budget": st.column_config.NumberColumn("Guaranteed budget (CHF)", min_value=0.0)},
+    )
+    project_budgets = dict(zip(budgets["project"], budgets["budget"].fillna(0)))
+
+    result = allocation.allocate(expenses, project_budgets, board_budget, scenario)
+    summary, board_left = allocation.allocation_summary(result, project_budgets, board_budget)
+    st.subheader("Per project")
+    st.dataframe(summary, hide_index=True)
+    st.caption(f"Board budget left: CHF {board_left:,.2f}")
+
+    # Summen nach Status und kumuliert nach Datum, unabhängig vom Vorschlag oben
+    buckets = st.session_state["allocation_buckets"]
+    st.subheader("By status")
+    st.dataframe(aggregation.status_breakdown(buckets), hide_index=True)
+    st.subheader("Cumulative spend by date")
+    cumulative, undated = aggregation.cumulative_by_date(buckets)
+    if not cumulative.empty:
+        st.line_chart(cumulative, x="expense_date")
+    st.dataframe(cumulative, hide_index=True)
+    st.caption("Without a date: 'unknown' is not known yet, 'none' is not associated with a date.")
+    st.dataframe(undated)
+    st.subheader("Expenses")
+    st.dataframe(result, hide_index=True)
+
+    changes = allocation.status_changes(result)
+    if st.button(f"Save as proposed statuses ({len(changes)} changed)", disabled=not changes):
         try:
-            # Prüfen, ob die Expense zur angemeldeten Gruppe gehört
-            response = table.get_item(Key={"id": str(expense_id)})
-            item = response.get("Item")
-    
-            if not item:
-                st.error("No expense found with this ID.")
-                return
-    
-            if item["project"] != st.session_state["user"]:
-                st.error("You can only delete expenses from your own project.")
-                return
-    
-            # Löschen des Eintrags aus DynamoDB
-            table.delete_item(Key={"id": str(expense_id)})
-            st.success(f"Expense successfully deleted!")
-    
-            # Reload-Button anbieten
-            if st.button("Refresh to view changes"):
-                st.rerun()
-    
+            updated = store.propose_statuses(changes)
+            del st.session_state["allocation_semester"]  # Beim nächsten Rerun neu laden
+            st.success(f"{updated} status(es) proposed.")
         except Exception as error:
-            st.error(f"Error deleting expense: {error}")
-    
-    
-    # **Hier beginnt ein neuer Codeblock – er gehört NICHT in die Funktion!**
-    if current_date <= deadline:
-        # ID-Eingabefeld zum Löschen
-        st.write("")
-        st.subheader("Delete an expense")
-        expense_id_to_delete = st.number_input("Enter the ID of the expense you want to delete", step=1)
-    
-        # Verwende Session-State, um den Zustand des überprüften Eintrags zu speichern
-        if "checked_expense" not in st.session_state:
-            st.session_state["checked_expense"] = None
-    
-        # Button "Check" zur Überprüfung des Eintrags
-        if st.button("Check"):
-            if expense_id_to_delete:
-                try:
-                    response = table.get_item(Key={"id": str(expense_id_to_delete)})
-                    item = response.get("Item")
-    
-                    if item and item["project"] == st.session_state["user"]:
-                        st.session_state["checked_expense"] = item
-                    else:
-                        st.error(f"No entry found with ID {expense_id_to_delete} for your project.")
-                        st.session_state["checked_expense"] = None
-    
-                except Exception as error:
-                    st.error(f"Error fetching expense: {error}")
-    
-        # Zeige den überprüften Eintrag an, wenn vorhanden
-        if st.session_state["checked_expense"]:
-            entry = st.session_state["checked_expense"]
-            container_content = f"""
-                <div style='background-color: {color}; padding: 15px; border-radius: 10px; margin-bottom: 10px;'>
-                    <p><strong>ID: </strong>{entry['id']}</p>
-                    <h4>{entry['title']}</h4>
-                    <p>{entry['description']}</p>
-                    <p><strong>Date: </strong>{entry['expense_date']}</p>
-                    <p><strong>Amount: </strong>CHF {entry['exact_amount'] if entry['exact_amount'] else f"{entry['estimated']} / {entry['conservative']} / {entry['worst_case']}"}</p>
-                    <p><strong>Priority: </strong>{entry['priority']}</p>
-                    <p><strong>Status: </strong>{entry['status']}</p>
-                </div>
-                """
-            st.markdown(container_content, unsafe_allow_html=True)
-    
-            # Button zum Löschen anzeigen, nachdem der Eintrag angezeigt wurde
-            if st.button("Delete"):
-                delete_expense_by_id(expense_id_to_delete)
-                st.session_state["checked_expense"] = None  # Zurücksetzen nach dem Löschen
-    
-
+            st.error(f"Error saving proposed statuses: {error}")
 
 
-# Funktion zum Überprüfen des Passworts
+# Funktion zum Überprüfen des Passworts: gehasht wird erst beim Login, verglichen in konstanter Zeit
 def check_password(username, password):
-    if username in users:
-        return users[username] == hashlib.sha256(password.encode()).hexdigest()
-    return False
+    expected = config.password_for(username)
+    if not expected:
+        return False
+    return hmac.compare_digest(hashlib.sha256(password.encode()).digest(), hashlib.sha256(expected.encode()).digest())
 
 # Login-Funktion
 def login():
@@ -447,7 +438,7 @@ def login():
         if check_password(username, password):
             st.session_state["logged_in"] = True
             st.session_state["username"] = username
-            st.session_state["user"] = user_names[username] 
+            st.session_state["user"] = config.USER_NAMES[username]
             # Seite sofort neu laden
             st.rerun()  # Verwende st.rerun() um die Seite neu zu laden
         else:
@@ -458,7 +449,27 @@ def login():
 if "logged_in" not in st.session_state:
     st.session_state["logged_in"] = False
 
+# pandas, boto3 und der DynamoDB-Client werden erst nach dem Login geladen. Python hält die Module
+# danach in sys.modules, der Client bleibt in clients gecacht: jeder weitere Rerun kostet nichts mehr.
 if st.session_state["logged_in"]:
-    app()  # Starte die Hauptanwendung, wenn der Benutzer eingeloggt ist
+    import pandas as pd
+
+    import aggregation
+    import allocation
+    import clients
+    import db
+    import importer
+    import outbox
+    import render
+    import storage
+
+if st.session_state["logged_in"] and st.query_params.get("debug") == "1" and st.session_state["username"] in ADMIN_USERS:
+    debug_page()
+elif st.session_state["logged_in"] and st.query_params.get("allocation") == "1" and st.session_state["username"] in ADMIN_USERS:
+    allocation_page()
+elif st.session_state["logged_in"]:
+    # Misst den ganzen Rerun, falls OIKOS_INSTRUMENTATION gesetzt ist
+    with instrumentation.rerun(st.session_state["username"]):
+        app()  # Starte die Hauptanwendung, wenn der Benutzer eingeloggt ist
 else:
     login()  # Zeige die Login-Seite, wenn der Benutzer nicht eingeloggt ist
@@ -0,0 +1,218 @@
+# Lokale Warteschlange für neue Ausgaben (write-behind): das Formular speichert die Eingabe nur in
+# einer SQLite-Datei und ist sofort fertig. Ein Hintergrund-Thread schreibt die Einträge in
+# Batches in den Speicher (storage.py), bei Drosselung oder Fehlern mit exponentiell wachsender
+# Pause. Die Datei überlebt einen Neustart; was noch nicht gespeichert ist, wird danach nachgeholt.
+#
+# Jede Eingabe hat einen Schlüssel (Idempotenz): dieselbe Eingabe wird nur einmal angenommen.
+# Die ID wird vor dem ersten Schreibversuch vergeben und in der Datei gespeichert, damit ein
+# erneuter Versuch denselben Eintrag schreibt statt einen zweiten.
+#
+# Wiederholt wird nur, was der Speicher als vorübergehend einstuft (store.is_transient: Drosselung,
+# Zeitüberschreitung, Verbindungsabbruch). Jeder andere Fehler markiert die Eingabe als
+# fehlgeschlagen; sie bleibt mit der Fehlermeldung sichtbar, bremst aber die übrigen nicht.
+import contextlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+OUTBOX_PATH = os.getenv("OIKOS_OUTBOX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.sqlite3"))
+BATCH_SIZE = int(os.getenv("OIKOS_OUTBOX_BATCH_SIZE", "25"))
+FLUSH_INTERVAL = float(os.getenv("OIKOS_OUTBOX_INTERVAL", "2"))  # Sekunden zwischen zwei Durchgängen ohne neue Eingabe
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = float(os.getenv("OIKOS_OUTBOX_MAX_BACKOFF", "60"))
+KEEP_FLUSHED = 24 * 3600  # Gespeicherte und fehlgeschlagene Einträge bleiben einen Tag, damit ihr Schlüssel bekannt bleibt
+
+# Fehlercodes von DynamoDB, wenn die Kapazität (auch nach den Retries von botocore) nicht reicht
+THROTTLING_CODES = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS submissions (
+        key TEXT PRIMARY KEY,
+        project TEXT NOT NULL,
+        row TEXT NOT NULL,  -- Felder wie bei insert_expense samt semester, als JSON
+        submitted_at REAL NOT NULL,
+        expense_id TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        flushed_at REAL,
+        failed_at REAL  -- Nicht vorübergehender Fehler: wird nicht wiederholt
+    );
+    CREATE INDEX IF NOT EXISTS submissions_open_idx ON submissions (flushed_at, submitted_at);
+"""
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+_initialized = set()
+_state = {"failures": 0, "backoff_until": 0.0, "last_error": None, "flushed": 0}
+
+
+@contextlib.contextmanager
+def _connection():
+    # Eine Verbindung pro Aufruf: SQLite-Verbindungen dürfen nicht zwischen Threads geteilt werden
+    connection = sqlite3.connect(OUTBOX_PATH, timeout=10)
+    try:
+        if OUTBOX_PATH not in _initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            # Dateien aus der Zeit vor failed_at nachrüsten
+            columns = {name for _, name, *_ in connection.execute("PRAGMA table_info(submissions)")}
+            if "failed_at" not in columns:
+                connection.execute("ALTER TABLE submissions ADD COLUMN failed_at REAL")
+            _initialized.add(OUTBOX_PATH)
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def submit(project, row, key=None):
+    # Nimmt eine Eingabe an und gibt ihren Schlüssel zurück; ein bekannter Schlüssel wird ignoriert
+    key = key or new_key()
+    with _connection() as connection:
+        connection.execute("INSERT OR IGNORE INTO submissions (key, project, row, submitted_at) VALUES (?, ?, ?, ?)",
+                           (key, project, json.dumps(row), time.time()))
+    _wakeup.set()
+    return key
+
+
+def pending(project, semester=None):
+    # Noch nicht gespeicherte Eingaben eines Projekts, älteste zuerst, als Einträge für render.card_html.
+    # Fehlgeschlagene Eingaben sind dabei, mit dem Status "failed, not saved" und der Fehlermeldung.
+    with _connection() as connection:
+        rows = connection.execute(
+            "SELECT key, row, expense_id, attempts, last_error, failed_at FROM submissions "
+            "WHERE flushed_at IS NULL AND project = ? ORDER BY submitted_at", (project,)).fetchall()
+    entries = []
+    for key, row, expense_id, attempts, last_error, failed_at in rows:
+        row = json.loads(row)
+        if semester and row.get("semester") != semester:
+            continue
+        status = "failed, not saved" if failed_at else "pending, retrying" if attempts else "pending"
+        entries.append({**row, "key": key, "id": expense_id, "project": project, "expense_date": row.get("date"),
+                        "status": status, "last_error": last_error})
+    return entries
+
+
+def _is_throttling(error):
+    return getattr(error, "response", {}).get("Error", {}).get("Code") in THROTTLING_CODES
+
+
+def _open_batch(connection, limit):
+    return connection.execute(
+        "SELECT key, project, row, expense_id FROM submissions WHERE flushed_at IS NULL AND failed_at IS NULL "
+        "ORDER BY submitted_at LIMIT ?",
+        (limit,)).fetchall()
+
+
+def _write(store, submissions):
+    # Scheitert der ganze Aufruf, gilt ein vorübergehender Fehler für jede Eingabe des Batches.
+    # Bei jedem anderen Fehler wird einzeln wiederholt, damit nur die Eingabe scheitert, die ihn auslöst.
+    try:
+        return store.write_submissions(submissions)
+    except Exception as error:
+        if store.is_transient(error) or len(submissions) == 1:
+            return {expense_id: error for _, expense_id, _, _ in submissions}
+    outcomes = {}
+    for submission in submissions:
+        outcomes.update(_write(store, [submission]))
+    return outcomes
+
+
+def flush(store, limit=None):
+    # Ein Durchgang: höchstens limit Eingaben in den Speicher schreiben. Gibt die Anzahl gespeicherter
+    # Eingaben und die vorübergehenden Fehler (Exception-Objekte) zurück; Eingaben mit einem anderen
+    # Fehler werden als fehlgeschlagen markiert und nicht wiederholt.
+    with _flush_lock:
+        with _connection() as connection:
+            batch = _open_batch(connection, limit or BATCH_SIZE)
+        if not batch:
+            return 0, []
+
+        # 1. Fehlende IDs vergeben und speichern, bevor geschrieben wird
+        missing = [key for key, _, _, expense_id in batch if expense_id is None]
+        if missing:
+            ids = store.allocate_ids(len(missing))
+            with _connection() as connection:
+                connection.executemany("UPDATE submissions SET expense_id = ? WHERE key = ? AND expense_id IS NULL",
+                                       zip(ids, missing))
+                batch = [entry for entry in _open_batch(connection, limit or BATCH_SIZE) if entry[3] is not None]
+
+        # 2. Schreiben
+        submissions = [(key, expense_id, project, json.loads(row)) for key, project, row, expense_id in batch]
+        outcomes = _write(store, submissions)
+
+        # 3. Ergebnis festhalten
+        now = time.time()
+        done = [key for key, expense_id, _, _ in submissions if outcomes[expense_id] in ("written", "exists")]
+        collided = [key for key, expense_id, _, _ in submissions if outcomes[expense_id] == "collision"]
+        errors = [(key, outcomes[expense_id]) for key, expense_id, _, _ in submissions
+                  if isinstance(outcomes[expense_id], Exception)]
+        retried = [(key, error) for key, error in errors if store.is_transient(error)]
+        failed = [(key, error) for key, error in errors if not store.is_transient(error)]
+        with _connection() as connection:
+            connection.executemany("UPDATE submissions SET flushed_at = ? WHERE key = ?", [(now, key) for key in done])
+            # ID von einem fremden Eintrag belegt: beim nächsten Durchgang eine neue vergeben
+            connection.executemany("UPDATE submissions SET expense_id = NULL WHERE key = ?", [(key,) for key in collided])
+            connection.executemany("UPDATE submissions SET attempts = attempts + 1, last_error = ? WHERE key = ?",
+                                   [(str(error), key) for key, error in retried])
+            connection.executemany("UPDATE submissions SET attempts = attempts + 1, last_error = ?, failed_at = ? WHERE key = ?",
+                                   [(f"{type(error).__name__}: {error}", now, key) for key, error in failed])
+            connection.execute("DELETE FROM submissions WHERE flushed_at < ? OR failed_at < ?",
+                               (now - KEEP_FLUSHED, now - KEEP_FLUSHED))
+        return len(done), [error for _, error in retried]
+
+
+def _backoff(failures):
+    # Exponentiell wachsende Pause mit Zufallsanteil, damit mehrere Prozesse nicht gleichzeitig wiederholen
+    return min(BASE_BACKOFF * 2 ** failures, MAX_BACKOFF) * random.uniform(0.5, 1)
+
+
+def _run(store):
+    while True:
+        _wakeup.wait(FLUSH_INTERVAL)
+        _wakeup.clear()
+        try:
+            flushed, errors = flush(store)
+        except Exception as error:  # z. B. gedrosselt beim Vergeben der IDs
+            flushed, errors = 0, [error]
+        _state["flushed"] += flushed
+        if errors:
+            _state["failures"] += 1
+            _state["last_error"] = f"{'Throttled: ' if any(map(_is_throttling, errors)) else ''}{errors[0]}"
+            delay = _backoff(_state["failures"])
+            _state["backoff_until"] = time.time() + delay
+            time.sleep(delay)  # Neue Eingaben verkürzen die Pause nicht
+            _wakeup.set()
+        else:
+            _state["failures"] = 0
+            if flushed:
+                _wakeup.set()  # Es kann noch mehr warten: gleich den nächsten Batch
+
+
+def start_worker(store):
+    # Ein Hintergrund-Thread pro Prozess; beim Start wird auch nachgeholt, was vor einem Neustart liegen blieb
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, args=(store,), name="outbox", daemon=True)
+            _worker.start()
+            _wakeup.set()
+    return _worker
+
+
+def stats():
+    with _connection() as connection:
+        waiting, failed = connection.execute(
+            "SELECT COUNT(*) - COUNT(failed_at), COUNT(failed_at) FROM submissions WHERE flushed_at IS NULL").fetchone()
+    return {"pending": waiting, "failed": failed, "flushed": _state["flushed"], "failures_in_a_row": _state["failures"],
+            "backoff_seconds_left": max(0.0, _state["backoff_until"] - time.time()), "last_error": _state["last_error"]}
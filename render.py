@@ -0,0 +1,95 @@
+import html
+import math
+from string import Template
+
+import pandas as pd
+
+from config import PROJECT_COLORS
+
+CARDS_PER_ROW = 3
+CARDS_PER_PAGE = 30
+
+# Einmal kompilierte Vorlage für eine Karte. Ohne Einrückung, weil Markdown eingerückte
+# Zeilen sonst als Codeblock darstellt.
+CARD_TEMPLATE = Template(
+    "<div style='background-color: $color; padding: 15px; border-radius: 10px; margin-bottom: 10px;$extra_style'>"
+    "<p>id: $id</p>"
+    "<h4>$title</h4>"
+    "<p>$description</p>"
+    "<p><strong>Date: </strong>$expense_date</p>"
+    "<p><strong>Amount:</strong> CHF $amount</p>"
+    "<p><strong>Priority:</strong> $priority</p>"
+    "<p><strong>Status:</strong> $status</p>"
+    "</div>"
+)
+
+# Noch nicht gespeicherte Eingaben (outbox.py) blass und gestrichelt umrandet
+PENDING_STYLE = " opacity: 0.6; border: 2px dashed #555555;"
+
+# Alle Karten einer Seite in einem einzigen Raster statt einer Markdown-Ausgabe pro Karte
+GRID_TEMPLATE = Template(
+    f"<div style='display: grid; grid-template-columns: repeat({CARDS_PER_ROW}, minmax(0, 1fr)); column-gap: 1rem;'>"
+    "$cards"
+    "</div>"
+)
+
+
+def project_color(project_name):
+    return PROJECT_COLORS.get(project_name, "#DDDDDD")
+
+
+def _is_missing(value):
+    # Im geladenen DataFrame stehen fehlende Texte als "None" bzw. "nan"
+    if isinstance(value, str):
+        return value in ["", "None", "nan"]
+    return pd.isna(value)
+
+
+def _number(value):
+    return None if _is_missing(value) else float(value)
+
+
+def _amount_text(entry):
+    # Exakter Betrag, sonst die drei Schätzungen, sonst N/A
+    exact_amount = _number(entry.get("exact_amount"))
+    if exact_amount and exact_amount > 0:
+        return str(exact_amount)
+    estimates = [_number(entry.get(field)) for field in ["estimated", "conservative", "worst_case"]]
+    if all(estimates):
+        return " / ".join(str(estimate) for estimate in estimates)
+    return "N/A"
+
+
+def _text(value):
+    return "N/A" if _is_missing(value) else html.escape(str(value))
+
+
+def card_html(entry, color, pending=False):
+    # entry kann eine Zeile des DataFrames (als dict), ein Item aus DynamoDB oder eine wartende Eingabe sein
+    return CARD_TEMPLATE.substitute(
+        color=color,
+        extra_style=PENDING_STYLE if pending else "",
+        id=_text(entry.get("id")),
+        title=_text(entry.get("title")),
+        description=_text(entry.get("description")),
+        expense_date=_text(entry.get("expense_date")),
+        amount=_amount_text(entry),
+        priority=_text(entry.get("priority")),
+        status=_text(entry.get("status")),
+    )
+
+
+def page_count(expenses):
+    return max(1, math.ceil(len(expenses) / CARDS_PER_PAGE))
+
+
+def cards_html(expenses, color, page=1):
+    # HTML für eine Seite der Übersicht; nur die Einträge dieser Seite werden aufbereitet
+    start = (page - 1) * CARDS_PER_PAGE
+    records = expenses.iloc[start:start + CARDS_PER_PAGE].to_dict("records")
+    return GRID_TEMPLATE.substitute(cards="".join(card_html(entry, color) for entry in records))
+
+
+def pending_cards_html(entries, color):
+    # Wartende Eingaben in einem eigenen Raster über der Übersicht
+    return GRID_TEMPLATE.substitute(cards="".join(card_html(entry, color, pending=True) for entry in entries))
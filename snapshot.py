@@ -0,0 +1,221 @@
+# Export der ganzen Tabelle als Parquet-Snapshot für die Auswertung der Leitung.
+# Die Tabelle wird Seite für Seite gescannt, jede Seite direkt in einen Arrow-RecordBatch
+# umgewandelt und nach Projekt und Semester partitioniert geschrieben; der Speicherbedarf
+# hängt damit nur von der Seitengrösse ab, nicht von der Tabelle.
+#
+# Aufbau von OIKOS_SNAPSHOT_DIR:
+#   manifest.json                         Stand des letzten abgeschlossenen Exports
+#   ids.parquet                           alle IDs beim letzten Export (um Löschungen zu erkennen)
+#   expenses/project=.../semester=.../    part-<snapshot>-<n>.parquet
+#   deletes/part-<snapshot>.parquet       seit dem vorherigen Export gelöschte IDs
+#
+# Ein inkrementeller Export hängt nur Einträge an, deren updated_at nach dem letzten Export liegt.
+# Änderungen ohne updated_at (z. B. Status, den die Leitung direkt in der Tabelle setzt) erfasst
+# nur ein vollständiger Export.
+#
+# Ausführen mit: python snapshot.py [--full] [--dir DIR]
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import config
+import db
+
+SNAPSHOT_DIR = os.getenv("OIKOS_SNAPSHOT_DIR")  # Ohne Verzeichnis liest die App immer aus DynamoDB
+SNAPSHOT_MAX_AGE = float(os.getenv("OIKOS_SNAPSHOT_MAX_AGE", "900"))  # Sekunden
+
+SCHEMA = pa.schema(
+    [(col, pa.string()) for col in ["id", "project", "semester", "title", "description", "expense_date"]]
+    + [(col, pa.float64()) for col in db.AMOUNT_COLUMNS]
+    + [("priority", pa.int64()), ("status", pa.string()), ("updated_at", pa.string()), ("snapshot", pa.int64())]
+)
+PARTITIONING = ds.partitioning(pa.schema([("project", pa.string()), ("semester", pa.string())]), flavor="hive")
+
+
+def _paths(directory):
+    return {name: os.path.join(directory, name) for name in ["manifest.json", "ids.parquet", "expenses", "deletes"]}
+
+
+def read_manifest(directory=None):
+    path = _paths(directory or SNAPSHOT_DIR)["manifest.json"]
+    if not os.path.exists(path):
+        return None
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def _write_manifest(directory, manifest):
+    # Erst schreiben, dann umbenennen: Leser sehen nur abgeschlossene Exporte
+    path = _paths(directory)["manifest.json"]
+    with open(path + ".tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _column(frame, col):
+    return frame[col] if col in frame.columns else pd.Series([None] * len(frame), dtype=object)
+
+
+def page_to_batch(page, sequence):
+    # Spaltenweise Umwandlung einer Scan-Seite; fehlende Attribute und NULL werden zu null
+    frame = pd.DataFrame(page, dtype=object)
+    columns = {}
+    for col in SCHEMA.names:
+        values = _column(frame, col)
+        if col in db.AMOUNT_COLUMNS or col == "priority":
+            columns[col] = pa.array(pd.to_numeric(values, errors="coerce"), from_pandas=True).cast(SCHEMA.field(col).type)
+        elif col == "semester":
+            # Einträge ohne Semester stammen von vor dessen Einführung
+            columns[col] = pa.array(values.where(values.notna(), config.LEGACY_SEMESTER), type=pa.string())
+        elif col == "snapshot":
+            columns[col] = pa.array([sequence] * len(frame), type=pa.int64())
+        else:
+            columns[col] = pa.array(values.where(values.notna(), None), type=pa.string(), from_pandas=True)
+    return pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+
+
+def export(directory=None, full=False):
+    # Schreibt einen neuen Snapshot; ohne vorherigen Export immer vollständig
+    directory = directory or SNAPSHOT_DIR
+    if not directory:
+        raise ValueError("No snapshot directory, set OIKOS_SNAPSHOT_DIR or pass --dir")
+    paths = _paths(directory)
+    manifest = read_manifest(directory)
+    full = full or manifest is None
+    manifest = manifest or {"sequence": 0, "base": 1, "snapshots": []}
+    os.makedirs(paths["deletes"], exist_ok=True)
+
+    sequence = manifest["sequence"] + 1
+    watermark = None if full else manifest["watermark"]
+    started_at = time.time()
+    started_iso = db.now_iso()
+    seen_ids = []
+    written = {"items": 0, "scanned": 0}
+
+    def batches():
+        for page in db.scan_pages():
+            written["scanned"] += len(page)
+            seen_ids.append(pa.array([item["id"] for item in page], type=pa.string()))
+            if watermark:
+                page = [item for item in page if (item.get("updated_at") or "") >= watermark]
+            if page:
+                written["items"] += len(page)
+                yield page_to_batch(page, sequence)
+
+    ds.write_dataset(batches(), paths["expenses"], schema=SCHEMA, format="parquet", partitioning=PARTITIONING,
+                     basename_template=f"part-{sequence}-{{i}}.parquet", existing_data_behavior="overwrite_or_ignore")
+
+    # Gelöscht ist, was beim letzten Export da war und jetzt fehlt
+    current_ids = pa.chunked_array(seen_ids, type=pa.string())
+    deleted = pa.chunked_array([], type=pa.string())
+    if not full and os.path.exists(paths["ids.parquet"]):
+        previous_ids = pq.read_table(paths["ids.parquet"])["id"]
+        deleted = previous_ids.filter(pc.invert(pc.is_in(previous_ids, value_set=current_ids)))
+    if len(deleted):
+        pq.write_table(pa.table({"id": deleted, "snapshot": pa.array([sequence] * len(deleted), type=pa.int64())}),
+                       os.path.join(paths["deletes"], f"part-{sequence}.parquet"))
+    pq.write_table(pa.table({"id": current_ids}), paths["ids.parquet"])
+
+    if full:
+        manifest["base"] = sequence
+    manifest["sequence"] = sequence
+    manifest["watermark"] = started_iso
+    manifest["started_at"] = started_at
+    manifest["snapshots"].append({"sequence": sequence, "full": full, "started_at": started_iso,
+                                  "scanned": written["scanned"], "written": written["items"], "deleted": len(deleted),
+                                  "seconds": time.time() - started_at})
+    _write_manifest(directory, manifest)
+
+    # Nach einem vollständigen Export werden die älteren Dateien erst jetzt entfernt,
+    # damit die App bis zum neuen Manifest einen vollständigen Stand lesen kann
+    if full:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.startswith("part-") and int(name[5:].split("-")[0].split(".")[0]) < sequence:
+                    os.remove(os.path.join(root, name))
+    return manifest["snapshots"][-1]
+
+
+def read_expenses(directory=None, project=None, manifest=None, semester=None):
+    # Aktueller Stand aus allen Snapshot-Dateien: pro ID die neueste Version, ohne gelöschte IDs
+    directory = directory or SNAPSHOT_DIR
+    paths = _paths(directory)
+    manifest = manifest or read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot in {directory}")
+    if not os.path.isdir(paths["expenses"]):
+        return db.pages_to_expenses([])
+
+    # Dateien eines noch laufenden Exports (höhere Nummer als im Manifest) und solche vor dem
+    # letzten vollständigen Export werden ignoriert
+    condition = (ds.field("snapshot") >= manifest["base"]) & (ds.field("snapshot") <= manifest["sequence"])
+    if project is not None:
+        condition = condition & (ds.field("project") == project)
+    if semester is not None:
+        condition = condition & (ds.field("semester") == semester)
+    expenses = ds.dataset(paths["expenses"], schema=SCHEMA, format="parquet", partitioning=PARTITIONING)
+    df = expenses.to_table(filter=condition).to_pandas()
+    df = df.sort_values("snapshot", kind="stable").drop_duplicates("id", keep="last")
+
+    if os.listdir(paths["deletes"]):
+        deletes = ds.dataset(paths["deletes"], format="parquet").to_table(
+            filter=(ds.field("snapshot") >= manifest["base"]) & (ds.field("snapshot") <= manifest["sequence"])).to_pandas()
+        deleted_at = df["id"].map(deletes.groupby("id")["snapshot"].max())
+        df = df[~(deleted_at > df["snapshot"])]
+
+    df = df.drop(columns="snapshot").sort_values("id", key=lambda ids: pd.to_numeric(ids, errors="coerce"), kind="stable")
+    # Fehlende Werte wie bei DynamoDB als None, damit die Umwandlung dieselben Werte liefert
+    df = df.astype(object).where(df.notna(), None)
+    return db.pages_to_expenses([df.reset_index(drop=True)])
+
+
+def is_fresh(project, manifest):
+    # Der Snapshot gilt, solange er jung genug ist und dieser Prozess das Projekt seit Beginn
+    # des Exports nicht verändert hat (Schreiben aus anderen Prozessen deckt nur das Höchstalter ab)
+    return (manifest is not None
+            and time.time() - manifest["started_at"] <= SNAPSHOT_MAX_AGE
+            and db.last_write(project) < manifest["started_at"])
+
+
+def load_project_expenses(project, sort_by=None, semester=None):
+    # Übersicht eines Projekts aus dem Snapshot, solange dieser aktuell ist; sonst None.
+    # Zwischengespeichert wie die Einträge aus DynamoDB und mit ihnen invalidiert.
+    if not SNAPSHOT_DIR:
+        return None
+    generation = db.expense_cache.generation(project)  # vor der Prüfung, siehe db.cached_project_expenses
+    manifest = read_manifest()
+    if not is_fresh(project, manifest):
+        return None
+    key = (project, sort_by, semester, "snapshot", manifest["sequence"])
+    cached = db.expense_cache.get(key)
+    if cached is not None:
+        df, stats = cached
+        return df, dict(stats, cached=True)
+    start = time.perf_counter()
+    df = db.sort_expenses(read_expenses(project=project, manifest=manifest, semester=semester), sort_by)
+    stats = {"items": len(df), "pages": 0, "source": f"snapshot {manifest['sequence']}",
+             "seconds": time.perf_counter() - start}
+    db.expense_cache.put(key, (df, stats), project, generation)
+    return df, dict(stats, cached=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all expenses as a partitioned Parquet snapshot")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="snapshot directory (default: OIKOS_SNAPSHOT_DIR)")
+    parser.add_argument("--full", action="store_true", help="rewrite the whole snapshot instead of appending changes")
+    args = parser.parse_args()
+    result = export(args.dir, full=args.full)
+    kind = "Full" if result["full"] else "Incremental"
+    print(f"{kind} snapshot {result['sequence']}: {result['written']} of {result['scanned']} expenses written, "
+          f"{result['deleted']} deleted, {result['seconds']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Gemeinsame Vorbereitung der Tests: moto als lokaler Ersatz für DynamoDB, gestartet vor dem
+# Import von db (das beim Import die Resource erstellt). Jeder Test bekommt frische Tabellen.
+import os
+import sys
+
+os.environ.setdefault("AWS_REGION", "eu-central-1")
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+os.environ.pop("DYNAMODB_ENDPOINT_URL", None)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest  # noqa: E402
+from moto import mock_aws  # noqa: E402
+
+mock_aws().start()
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def tables():
+    db.create_expense_table()
+    db.create_counter_table()
+    db.create_summary_table()
+    db._id_block.clear()
+    db._index_status.clear()
+    db.expense_cache.invalidate()
+    yield db
+    for table in (db.table, db.counter_table, db.summary_table):
+        table.delete()
+    db._id_block.clear()
+    db.expense_cache.invalidate()
+
+
+@pytest.fixture
+def calls():
+    # Zählt die Aufrufe an DynamoDB pro Operation, z. B. calls["UpdateItem"]
+    counted = {}
+
+    def count(model, **kwargs):
+        counted[model.name] = counted.get(model.name, 0) + 1
+
+    events = db.dynamodb.meta.client.meta.events
+    events.register("before-call.dynamodb", count)
+    yield counted
+    events.unregister("before-call.dynamodb", count)
+
+
+def expense_values(**overrides):
+    values = dict(title="Venue", description="Rent", date="2025-04-10", exact_amount=1200.0,
+                  estimated=None, conservative=None, worst_case=None, priority=1)
+    return {**values, **overrides}
@@ -0,0 +1,38 @@
+import pandas as pd
+
+import aggregation
+import db
+from conftest import expense_values
+
+
+def buckets():
+    rows = [("1", "A", "2025-04-10", 100.0, 1), ("2", "A", "2025-03-01", 50.0, None),
+            ("3", "A", "unknown", 20.0, 2), ("4", "A", None, 5.0, 3)]
+    items = [db.build_expense_item(expense_id, project, **expense_values(date=date, exact_amount=amount, priority=priority))
+             for expense_id, project, date, amount, priority in rows]
+    items.append(db.build_expense_item("5", "B", **expense_values(date=None, exact_amount=None, estimated=10.0,
+                                                                  conservative=20.0, worst_case=30.0)))
+    items[0]["status"] = "approved"
+    return aggregation.summarize(db.pages_to_expenses([pd.DataFrame(items, dtype=object)]))
+
+
+def test_status_breakdown():
+    totals = aggregation.status_breakdown(buckets())
+    columns = ["project", "status", "count", "exact_plus_estimated", "exact_plus_worst_case"]
+    assert totals[columns].values.tolist() == [
+        ["A", "approved", 1, 100.0, 100.0],
+        ["A", "not assigned", 3, 75.0, 75.0],
+        ["B", "not assigned", 1, 10.0, 30.0],
+    ]
+
+
+def test_cumulative_by_date_keeps_unknown_and_undated_apart():
+    cumulative, undated = aggregation.cumulative_by_date(buckets())
+    assert cumulative[["expense_date", "cumulative_exact_amount", "cumulative_exact_plus_worst_case"]].values.tolist() == [
+        ["2025-03-01", 50.0, 50.0],
+        ["2025-04-10", 150.0, 150.0],
+    ]
+    assert undated[["count", "exact_amount", "exact_plus_estimated", "exact_plus_worst_case"]].to_dict("index") == {
+        aggregation.NO_DATE: {"count": 2, "exact_amount": 5.0, "exact_plus_estimated": 15.0, "exact_plus_worst_case": 35.0},
+        aggregation.UNKNOWN_DATE: {"count": 1, "exact_amount": 20.0, "exact_plus_estimated": 20.0, "exact_plus_worst_case": 20.0},
+    }
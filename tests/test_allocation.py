@@ -0,0 +1,36 @@
+import pandas as pd
+
+import allocation
+import db
+from conftest import expense_values
+
+
+def expenses(rows):
+    items = [db.build_expense_item(expense_id, project, **expense_values(title=expense_id, exact_amount=amount, priority=priority))
+             for expense_id, project, amount, priority in rows]
+    return db.pages_to_expenses([pd.DataFrame(items, dtype=object)])
+
+
+def funding(result):
+    funded_from = [None if pd.isna(value) else value for value in result["funded_from"]]
+    return dict(zip(result["id"], zip(funded_from, result["board_share"])))
+
+
+def test_board_pays_only_the_shortfall_beyond_the_project_budget():
+    result = allocation.allocate(expenses([("a1", "A", 600.0, 1), ("a2", "A", 100.0, 2), ("b1", "B", 50.0, 1)]),
+                                 {"A": 500}, 600)
+    assert funding(result) == {"a1": (allocation.FROM_BOTH_BUDGETS, 100.0), "a2": (allocation.FROM_BOARD_BUDGET, 100.0),
+                               "b1": (allocation.FROM_BOARD_BUDGET, 50.0)}
+
+    summary, board_left = allocation.allocation_summary(result, {"A": 500}, 600)
+    assert summary.set_index("project")[["from_project", "from_board", "not_funded"]].to_dict("index") == {
+        "A": {"from_project": 500.0, "from_board": 200.0, "not_funded": 0.0},
+        "B": {"from_project": 0.0, "from_board": 50.0, "not_funded": 0.0},
+    }
+    assert board_left == 350
+
+
+def test_lower_priority_is_never_funded_before_a_higher_one():
+    result = allocation.allocate(expenses([("a1", "A", 300.0, 1), ("a2", "A", 900.0, 2), ("a3", "A", 50.0, 3)]),
+                                 {"A": 400}, 400)
+    assert funding(result) == {"a1": (allocation.FROM_PROJECT_BUDGET, 0.0), "a2": (None, 0.0), "a3": (None, 0.0)}
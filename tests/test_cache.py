@@ -0,0 +1,35 @@
+from unittest import mock
+
+import db
+from conftest import expense_values
+
+
+def write_while_loading(load):
+    # Ein Schreiben, das landet, nachdem die Abfrage gelesen hat, aber bevor das Ergebnis im Cache ist
+    def load_then_write(*args, **kwargs):
+        result = load(*args, **kwargs)
+        db.insert_expense("Oismak", **expense_values())
+        return result
+    return load_then_write
+
+
+def test_write_during_load_is_not_hidden_by_the_cache(tables):
+    with mock.patch.object(db, "load_project_expenses", write_while_loading(db.load_project_expenses)):
+        df, stats = db.cached_project_expenses("Oismak", None, "FS2025")
+    assert df.empty and not stats["cached"]
+
+    df, stats = db.cached_project_expenses("Oismak", None, "FS2025")
+    assert len(df) == 1 and not stats["cached"]
+    assert db.cached_project_expenses("Oismak", None, "FS2025")[1]["cached"]
+
+
+def test_write_during_summary_load_is_not_hidden_by_the_cache(tables):
+    with mock.patch.object(db, "load_summary", write_while_loading(db.load_summary)):
+        assert db.cached_summary("Oismak", "FS2025").empty
+    assert not db.cached_summary("Oismak", "FS2025").empty
+
+
+def test_writes_to_other_projects_keep_the_cache(tables):
+    db.cached_project_expenses("Oismak", None, "FS2025")
+    db.insert_expense("Other", **expense_values())
+    assert db.cached_project_expenses("Oismak", None, "FS2025")[1]["cached"]
@@ -0,0 +1,80 @@
+import threading
+
+import db
+from conftest import expense_values
+
+
+def test_block_reservation_costs_one_update_per_block(tables, calls):
+    db.seed_id_counter()
+    calls.clear()
+    ids = [db.next_expense_id() for _ in range(db.ID_BLOCK_SIZE)]
+    assert calls == {"UpdateItem": 1}
+    assert ids == [str(number) for number in range(1, db.ID_BLOCK_SIZE + 1)]
+
+    db.next_expense_id()
+    assert calls == {"UpdateItem": 2}
+
+
+def test_large_request_reserves_one_block(tables, calls):
+    db.seed_id_counter()
+    calls.clear()
+    ids = db.allocate_expense_ids(3 * db.ID_BLOCK_SIZE)
+    assert calls == {"UpdateItem": 1}
+    assert len(set(ids)) == 3 * db.ID_BLOCK_SIZE
+
+
+def test_counter_is_seeded_from_existing_ids(tables):
+    for expense_id in ["5", "42", "7"]:
+        db.table.put_item(Item=db.build_expense_item(expense_id, "Oismak", **expense_values()))
+    assert db.next_expense_id() == "43"
+
+
+def test_seeding_never_lowers_the_counter(tables):
+    db.allocate_expense_ids(db.ID_BLOCK_SIZE)
+    db.seed_id_counter()  # Tabelle leer, Zähler bleibt bei ID_BLOCK_SIZE
+    db._id_block.clear()
+    assert int(db.next_expense_id()) == db.ID_BLOCK_SIZE + 1
+
+
+def test_put_expense_skips_an_id_that_is_taken(tables):
+    db.seed_id_counter()
+    taken = db.build_expense_item("1", "Other project", **expense_values(title="Hand-made"))
+    db.table.put_item(Item=taken)
+
+    item = db.build_expense_item(db.next_expense_id(), "Oismak", **expense_values())
+    assert item["id"] == "1"
+    saved_id = db.put_expense(item)
+
+    assert saved_id != "1"
+    assert db.table.get_item(Key={"id": "1"})["Item"]["title"] == "Hand-made"
+    assert db.table.get_item(Key={"id": saved_id})["Item"]["project"] == "Oismak"
+
+
+def test_concurrent_allocation_has_no_duplicates(tables):
+    db.seed_id_counter()
+    allocated = []
+    lock = threading.Lock()
+
+    def allocate(count):
+        for _ in range(20):
+            ids = db.allocate_expense_ids(count)
+            with lock:
+                allocated.extend(ids)
+
+    threads = [threading.Thread(target=allocate, args=(1 + number % 3,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(allocated) == 20 * sum(1 + number % 3 for number in range(8))
+    assert len(set(allocated)) == len(allocated)
+
+
+def test_two_processes_get_disjoint_blocks(tables):
+    # Ein zweiter Prozess hat einen eigenen Zwischenspeicher, aber denselben Zähler
+    db.seed_id_counter()
+    first = db.allocate_expense_ids(5)
+    other_process_block = db._reserve_id_block(db.ID_BLOCK_SIZE)
+    rest = db.allocate_expense_ids(db.ID_BLOCK_SIZE)
+    assert not set(first + rest) & set(other_process_block)
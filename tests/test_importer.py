@@ -0,0 +1,51 @@
+import io
+
+import pandas as pd
+import pytest
+
+import importer
+
+VALID = ["Venue", "Rent", "2025-04-10", "1200", "", "", "", "1"]
+
+
+def upload(rows, name="expenses.csv"):
+    data = pd.DataFrame(rows, columns=importer.IMPORT_COLUMNS).to_csv(index=False).encode()
+    file = io.BytesIO(data)
+    file.name = name
+    return importer.read_expense_file(file)
+
+
+@pytest.mark.parametrize("field, value", [
+    ("priority", "inf"), ("priority", "nan"), ("priority", "-inf"), ("priority", "2.5"), ("priority", "0"),
+    ("exact_amount", "nan"), ("exact_amount", "inf"), ("exact_amount", "-50"), ("exact_amount", "1e130"),
+    ("date", "20250401"), ("date", "2025-W14-2"), ("date", "2025-02-30"), ("date", "10.04.2025"),
+])
+def test_invalid_cell_is_reported_per_row(field, value):
+    invalid = list(VALID)
+    invalid[importer.IMPORT_COLUMNS.index(field)] = value
+    valid_rows, report = importer.validate_rows(upload([VALID, invalid, VALID]))
+    assert len(valid_rows) == 2
+    assert list(report["row"]) == [3]
+
+
+def test_negative_estimate_is_rejected():
+    row = ["Catering", "Lunch", "unknown", "", "1500", "-1", "2200", "2"]
+    valid_rows, report = importer.validate_rows(upload([row]))
+    assert not valid_rows
+    assert "positive" in report["errors"][0]
+
+
+def test_amount_above_the_limit_is_rejected():
+    row = ["Catering", "Lunch", "unknown", "", "1500", "1800", "1e130", "2"]
+    valid_rows, report = importer.validate_rows(upload([VALID, row]))
+    assert len(valid_rows) == 1
+    assert list(report["row"]) == [3]
+    assert "exceed" in report["errors"][0]
+
+
+def test_valid_rows_are_parsed():
+    rows = [VALID, ["Catering", "Lunch", "unknown", "", "1'500", "1800", "2200", "2"], ["Material", "Paper", "", "30", "", "", "", "5"]]
+    valid_rows, report = importer.validate_rows(upload(rows))
+    assert report.empty
+    assert [row["date"] for row in valid_rows] == ["2025-04-10", "unknown", None]
+    assert valid_rows[1]["estimated"] == 1500.0
@@ -0,0 +1,86 @@
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+import db
+import outbox
+import storage
+from conftest import expense_values
+
+
+@pytest.fixture
+def queue(tables, tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_PATH", str(tmp_path / "outbox.sqlite3"))
+    return storage.DynamoStore()
+
+
+def lost_response(write):
+    # Stellvertreter für eine verlorene Antwort: der Server hat geschrieben, der Aufruf scheitert trotzdem
+    def write_then_fail(*args, **kwargs):
+        write(*args, **kwargs)
+        raise ClientError({"Error": {"Code": "RequestTimeout", "Message": "simulated"}}, "TransactWriteItems")
+    return write_then_fail
+
+
+def test_lost_response_is_saved_and_counted_once(queue):
+    key = outbox.submit("Oismak", dict(expense_values(exact_amount=100.0), semester="FS2025"))
+    db.cached_project_expenses("Oismak", None, "FS2025")  # Cache vor dem Speichern füllen
+
+    with mock.patch.object(db, "_write_with_summaries", lost_response(db._write_with_summaries)):
+        assert outbox.flush(queue)[0] == 0
+    assert outbox.flush(queue) == (1, [])  # zweiter Versuch: "exists"
+
+    items = db.table.scan()["Items"]
+    assert [item["submission_key"] for item in items] == [key]
+    summary = db.load_summary("Oismak")
+    assert summary[summary["kind"] == "priority"][["count", "exact_amount"]].sum().to_dict() == {"count": 1, "exact_amount": 100.0}
+    df, _ = db.cached_project_expenses("Oismak", None, "FS2025")
+    assert list(df["id"]) == [items[0]["id"]]
+
+
+class ThrottledOnceStore(storage.DynamoStore):
+    # Stellvertreter für Drosselung: der erste Aufruf scheitert, bevor etwas geschrieben ist
+    throttled = False
+
+    def write_submissions(self, submissions):
+        if not self.throttled:
+            self.throttled = True
+            raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "simulated"}},
+                              "TransactWriteItems")
+        return super().write_submissions(submissions)
+
+
+def test_throttled_submission_stays_pending_and_is_saved_once(queue):
+    store = ThrottledOnceStore()
+    key = outbox.submit("Oismak", dict(expense_values(), semester="FS2025"))
+    flushed, errors = outbox.flush(store)
+    assert flushed == 0 and store.is_transient(errors[0])
+    assert [entry["status"] for entry in outbox.pending("Oismak")] == ["pending, retrying"]
+
+    assert outbox.flush(store) == (1, [])
+    assert outbox.pending("Oismak") == []
+    assert [item["submission_key"] for item in db.table.scan()["Items"]] == [key]
+
+
+def test_permanent_failure_is_not_retried_and_does_not_block_others(queue):
+    # 1e130 kann DynamoDB nicht speichern (an validate_expense vorbei in die Warteschlange gelangt)
+    bad = outbox.submit("Oismak", dict(expense_values(exact_amount=1e130), semester="FS2025"))
+    good = outbox.submit("Oismak", dict(expense_values(), semester="FS2025"))
+    assert outbox.flush(queue) == (1, [])  # keine vorübergehenden Fehler: kein Backoff
+    assert outbox.flush(queue) == (0, [])  # die fehlgeschlagene Eingabe wird nicht wiederholt
+
+    assert [item["submission_key"] for item in db.table.scan()["Items"]] == [good]
+    failed, = outbox.pending("Oismak")
+    assert failed["key"] == bad and failed["status"] == "failed, not saved"
+    assert "Overflow" in failed["last_error"]
+    assert outbox.stats()["failed"] == 1 and outbox.stats()["pending"] == 0
+
+
+def test_submitting_the_same_key_twice_saves_one_expense(queue):
+    row = dict(expense_values(), semester="FS2025")
+    key = outbox.submit("Oismak", row)
+    outbox.flush(queue)
+    outbox.submit("Oismak", row, key=key)
+    outbox.flush(queue)
+    assert len(db.table.scan()["Items"]) == 1
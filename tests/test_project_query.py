@@ -0,0 +1,40 @@
+import pytest
+
+import db
+from conftest import expense_values
+
+
+@pytest.fixture
+def expenses(tables):
+    for expense_id, priority, date in [("1", 3, "2025-05-01"), ("2", None, "unknown"), ("3", 1, None), ("4", 2, "2025-04-01")]:
+        db.table.put_item(Item=db.build_expense_item(expense_id, "Oismak", **expense_values(priority=priority, date=date)))
+    db.table.put_item(Item=db.build_expense_item("5", "Other", **expense_values()))
+
+
+@pytest.mark.parametrize("semester", [None, "FS2025"])
+def test_sorting_by_priority_keeps_expenses_without_priority(expenses, semester):
+    unsorted, _ = db.load_project_expenses("Oismak", semester=semester)
+    by_priority, _ = db.load_project_expenses("Oismak", "priority", semester=semester)
+    assert sorted(unsorted["id"]) == ["1", "2", "3", "4"]
+    assert list(by_priority["id"]) == ["3", "4", "1", "2"]  # ohne Priorität zuletzt
+
+
+def test_sorting_by_date_puts_undated_last(expenses):
+    by_date, _ = db.load_project_expenses("Oismak", "expense_date")
+    assert list(by_date["id"][:2]) == ["4", "1"]
+    assert sorted(by_date["id"][2:]) == ["2", "3"]
+
+
+def test_ensure_project_indexes_drops_the_retired_priority_index(tables):
+    db.dynamodb.meta.client.update_table(
+        TableName=db.table_name,
+        AttributeDefinitions=[{"AttributeName": "project", "AttributeType": "S"},
+                              {"AttributeName": "priority", "AttributeType": "N"}],
+        GlobalSecondaryIndexUpdates=[{"Create": {
+            "IndexName": "project-priority-index",
+            "KeySchema": [{"AttributeName": "project", "KeyType": "HASH"}, {"AttributeName": "priority", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "ALL"}}}],
+    )
+    assert "project-priority-index" in db._active_indexes()
+    db.ensure_project_indexes()
+    assert sorted(db._active_indexes()) == sorted(db.INDEX_KEYS)
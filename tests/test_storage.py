@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+import allocation
+import storage
+from conftest import expense_values
+
+POSTGRES_DSN = os.getenv("OIKOS_POSTGRES_DSN")
+needs_postgres = pytest.mark.skipif(not POSTGRES_DSN, reason="OIKOS_POSTGRES_DSN not set (needs an empty test database)")
+
+
+def test_store_missing_a_method_fails_when_created():
+    class IncompleteStore(storage.ExpenseStore):
+        def insert_expense(self, *args):
+            return "1"
+
+    with pytest.raises(TypeError, match="abstract"):
+        IncompleteStore()
+
+
+@pytest.fixture
+def postgres():
+    store = storage.PostgresStore(POSTGRES_DSN)
+    store._execute("TRUNCATE expenses RESTART IDENTITY")
+    yield store
+    store.pool.closeall()
+
+
+def rows(store, project=None):
+    df, _ = store.load_project_expenses(project) if project else store.load_expenses()
+    return df.set_index("id")
+
+
+@needs_postgres
+def test_postgres_apply_changes_deletes_and_updates_own_expenses(postgres):
+    first, second, third = postgres.import_expenses("Oismak", [expense_values(title=title) for title in ["a", "b", "c"]])
+    other, = postgres.import_expenses("Other", [expense_values()])
+
+    result = postgres.apply_changes("Oismak", [first], {second: expense_values(title="b2", exact_amount=99.5, priority=None)})
+    assert result == {"deleted": 1, "updated": 1}
+    own = rows(postgres, "Oismak")
+    assert sorted(own.index) == [second, third]
+    assert own.loc[second, "title"] == "b2" and own.loc[second, "exact_amount"] == 99.5
+    assert own["priority"].isna().tolist() == [True, False]
+
+    # Eine fremde ID: nichts wird geändert
+    with pytest.raises(ValueError):
+        postgres.apply_changes("Oismak", [third, other], {})
+    assert sorted(rows(postgres).index) == sorted([second, third, other])
+
+
+@needs_postgres
+def test_postgres_propose_statuses_keeps_final_decisions(postgres):
+    open_id, final_id = postgres.import_expenses("Oismak", [expense_values(), expense_values()])
+    postgres._execute("UPDATE expenses SET status = 'approved' WHERE id = %s", (int(final_id),))
+
+    proposals = {open_id: allocation.PROPOSED_FUNDED, final_id: allocation.PROPOSED_NOT_FUNDED}
+    assert postgres.propose_statuses(proposals) == 1
+    statuses = rows(postgres)["status"].astype(str)
+    assert statuses.to_dict() == {open_id: allocation.PROPOSED_FUNDED, final_id: "approved"}
+
+
+@needs_postgres
+def test_postgres_write_submissions_is_idempotent(postgres):
+    ids = postgres.allocate_ids(2)
+    submissions = [(f"key{number}", expense_id, "Oismak", dict(expense_values(), semester="FS2025"))
+                   for number, expense_id in enumerate(ids)]
+    assert postgres.write_submissions(submissions) == dict.fromkeys(ids, "written")
+    assert postgres.write_submissions(submissions) == dict.fromkeys(ids, "exists")
+    assert sorted(rows(postgres, "Oismak").index) == sorted(ids)
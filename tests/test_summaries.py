@@ -0,0 +1,75 @@
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+import aggregation
+import db
+from conftest import expense_values
+
+
+def totals(project="Oismak"):
+    rows = db.load_summary(project)
+    return rows[rows["kind"] == "priority"][["count", "exact_amount"]].sum().to_dict()
+
+
+def throttled(*args, **kwargs):
+    raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "simulated"}}, "UpdateItem")
+
+
+def test_insert_and_delete_keep_summaries_in_step(tables):
+    expense_id = db.insert_expense("Oismak", **expense_values(exact_amount=100.0))
+    db.insert_expense("Oismak", **expense_values(exact_amount=50.0))
+    assert totals() == {"count": 2, "exact_amount": 150.0}
+
+    db.delete_expense(expense_id, "Oismak")
+    assert totals() == {"count": 1, "exact_amount": 50.0}
+    assert db.table.get_item(Key={"id": expense_id}).get("Item") is None
+
+
+def test_insert_writes_item_and_summaries_together(tables):
+    # Schlägt die Transaktion fehl, gibt es weder den Eintrag noch eine halbe Summe
+    db.seed_id_counter()
+    with mock.patch.object(db.dynamodb.meta.client, "transact_write_items", side_effect=throttled):
+        with pytest.raises(ClientError):
+            db.insert_expense("Oismak", **expense_values())
+    assert db.table.scan()["Items"] == []
+    assert db.summary_table.scan()["Items"] == []
+
+
+def test_insert_skips_taken_id_without_counting_twice(tables):
+    db.seed_id_counter()
+    db.table.put_item(Item=db.build_expense_item("1", "Other", **expense_values()))
+    saved_id = db.insert_expense("Oismak", **expense_values(exact_amount=10.0))
+    assert saved_id != "1"
+    assert totals() == {"count": 1, "exact_amount": 10.0}
+    assert db.load_summary("Other").empty
+
+
+def test_delete_leaves_other_projects_alone(tables):
+    expense_id = db.insert_expense("Other", **expense_values())
+    db.delete_expense(expense_id, "Oismak")
+    assert db.table.get_item(Key={"id": expense_id}).get("Item") is not None
+    assert totals("Other")["count"] == 1
+
+
+def test_failed_batch_summary_update_is_recorded(tables):
+    before = db.summary_errors()["count"]
+    items = [db.build_expense_item(expense_id, "Oismak", **expense_values()) for expense_id in ["1", "2"]]
+    with mock.patch.object(aggregation, "apply_items", side_effect=throttled):
+        db.put_expenses_batch(items)
+    errors = db.summary_errors()
+    assert errors["count"] == before + 1
+    assert "ProvisionedThroughputExceededException" in errors["last_error"]
+    assert len(db.table.scan()["Items"]) == 2  # Die Einträge selbst sind gespeichert
+
+
+def test_unrepresentable_amount_in_batch_is_recorded(tables):
+    # Vorbei an validate_expense: boto3 scheitert erst beim Serialisieren des ADD auf die Summen
+    before = db.summary_errors()["count"]
+    items = [db.build_expense_item("1", "Oismak", **expense_values()),
+             db.build_expense_item("2", "Oismak", **expense_values(exact_amount=1e130))]
+    assert db.put_expenses_batch(items) == ["1", "2"]
+    errors = db.summary_errors()
+    assert errors["count"] == before + 1
+    assert "Overflow" in errors["last_error"]